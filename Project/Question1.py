@@ -1,114 +1,81 @@
 import pandas as pd
 import plotly.graph_objects as go
-from shapely.geometry import Point
 import numpy as np
 
+import base_map
+import spatial
+import wkt
+
 building_csv_path = "VAST-Challenge-2022/Datasets/Attributes/Buildings.csv"
 apartment_csv_path = "VAST-Challenge-2022/Datasets/Attributes/Apartments.csv"
 pub_csv_path = "VAST-Challenge-2022/Datasets/Attributes/Pubs.csv"
 restaurant_csv_path = "VAST-Challenge-2022/Datasets/Attributes/Restaurants.csv"
 employers_csv_path = "VAST-Challenge-2022/Datasets/Attributes/Employers.csv"  # Assuming the file is named "Employers.csv"
+schools_csv_path = "VAST-Challenge-2022/Datasets/Attributes/Schools.csv"
 
 buildings_df = pd.read_csv(building_csv_path)
 apartments_df = pd.read_csv(apartment_csv_path)
 pubs_df = pd.read_csv(pub_csv_path)
 restaurants_df = pd.read_csv(restaurant_csv_path)
 employers_df = pd.read_csv(employers_csv_path)
+schools_df = pd.read_csv(schools_csv_path)
+
+building_coords, building_offsets, bad_buildings = wkt.parse_polygons(
+    buildings_df["location"]
+)
+wkt.report_bad_rows(building_csv_path, buildings_df["location"], bad_buildings)
+
+# Normalize building type
+building_type_all = base_map.normalize_building_types(buildings_df["buildingType"])
+valid_buildings = np.flatnonzero(np.diff(building_offsets) >= 3)
+building_types = building_type_all[valid_buildings].tolist()
+
+
+def parse_point_locations(df, csv_path):
+    """Returns the parsed (n, 2) locations of df and the positions of valid rows."""
+    coords, bad_rows = wkt.parse_points(df["location"])
+    wkt.report_bad_rows(csv_path, df["location"], bad_rows)
+    valid_rows = np.setdiff1d(np.arange(len(df)), bad_rows)
+    return coords[valid_rows], valid_rows
+
+
+apartment_points_coords, valid_rows = parse_point_locations(apartments_df, apartment_csv_path)
+apartment_ids = apartments_df["apartmentId"].to_numpy()[valid_rows].tolist()
+rental_costs = apartments_df["rentalCost"].to_numpy()[valid_rows].tolist()
+
+restaurant_points, valid_rows = parse_point_locations(restaurants_df, restaurant_csv_path)
+restaurant_ids = restaurants_df["restaurantId"].to_numpy()[valid_rows].tolist()
+restaurant_hourly = restaurants_df["foodCost"].to_numpy()[valid_rows].tolist()
+
+pub_points_coords, valid_rows = parse_point_locations(pubs_df, pub_csv_path)
+pub_ids = pubs_df["pubId"].to_numpy()[valid_rows].tolist()
+pub_hourly_costs = pubs_df["hourlyCost"].to_numpy()[valid_rows].tolist()
+
+employer_points_coords, valid_rows = parse_point_locations(employers_df, employers_csv_path)
+building_ids = employers_df["buildingId"].to_numpy()[valid_rows].tolist()
+
+school_points_coords, _ = parse_point_locations(schools_df, schools_csv_path)
+
+# Nearest amenity of each type for every apartment, one KD-tree query per type
+amenity_indexes = {
+    "pub": spatial.AmenityIndex(pub_points_coords),
+    "restaurant": spatial.AmenityIndex(restaurant_points),
+    "employer": spatial.AmenityIndex(employer_points_coords),
+    "school": spatial.AmenityIndex(school_points_coords),
+}
+apartment_amenities = spatial.nearest_amenities(apartment_points_coords, amenity_indexes)
+
+
+def nearest_amenity_text(i):
+    lines = []
+    for name in amenity_indexes:
+        distance = apartment_amenities[f"{name}_distance"].iat[i]
+        if np.isfinite(distance):
+            lines.append(f"Dist to Nearest {name.title()}: {distance:.2f} units")
+        else:
+            lines.append(f"No {name}s found nearby")
+    return "<br>".join(lines)
 
-building_polygons_coords = []
-building_types = []
-for poly_str, building_type in zip(
-    buildings_df["location"], buildings_df["buildingType"]
-):
-    coords = poly_str.replace("POLYGON ((", "").replace("))", "").split(", ")
-    points = []
-    for coord in coords:
-        try:
-            x, y = map(float, coord.strip().split())
-            points.append((x, y))
-        except ValueError:
-            continue
-    if len(points) >= 3:
-        # Normalize building type
-        bt = building_type.strip().lower()
-        if bt.startswith("resid"):
-            bt = "Residental"
-        elif bt.startswith("comm"):
-            bt = "Commercial"
-        elif bt.startswith("school"):
-            bt = "School"
-        building_polygons_coords.append(points)
-        building_types.append(bt)
-
-apartment_points_coords = []
-apartment_ids = []
-rental_costs = []
-for point_str, apartment_id, rental_cost in zip(
-    apartments_df["location"], apartments_df["apartmentId"], apartments_df["rentalCost"]
-):
-    coords = point_str.replace("POINT (", "").replace(")", "").split()
-    try:
-        x, y = map(float, coords)
-        apartment_points_coords.append((x, y))
-        apartment_ids.append(apartment_id)
-        rental_costs.append(rental_cost)
-    except ValueError:
-        continue
-
-restaurant_points = []
-restaurant_ids = []
-restaurant_hourly = []
-for point_str, rest_id, hourly in zip(
-    restaurants_df["location"], restaurants_df["restaurantId"], restaurants_df["foodCost"]
-):
-    coords = point_str.replace("POINT (", "").replace(")", "").split()
-    try:
-        x, y = map(float, coords)
-        restaurant_points.append((x, y))
-        restaurant_ids.append(rest_id)
-        restaurant_hourly.append(hourly)
-    except ValueError:
-        continue
-
-pub_points_coords = []
-pub_ids = []
-pub_hourly_costs = []
-for point_str, pub_id, hourly_cost in zip(
-    pubs_df["location"], pubs_df["pubId"], pubs_df["hourlyCost"]
-):
-    coords = point_str.replace("POINT (", "").replace(")", "").split()
-    try:
-        x, y = map(float, coords)
-        pub_points_coords.append((x, y))
-        pub_ids.append(pub_id)
-        pub_hourly_costs.append(hourly_cost)
-    except ValueError:
-        continue
-
-employer_points_coords = []
-building_ids = []
-for point_str, building_id in zip(
-    employers_df["location"], employers_df["buildingId"]
-):
-    coords = point_str.replace("POINT (", "").replace(")", "").split()
-    try:
-        x, y = map(float, coords)
-        employer_points_coords.append((x, y))
-        building_ids.append(building_id)
-    except ValueError:
-        continue
-
-apartment_nearest_pub_distance = []
-pub_points_shapely = [Point(x, y) for x, y in pub_points_coords]
-for x, y in apartment_points_coords:
-    apt_point = Point(x, y)
-    if pub_points_shapely:
-        min_dist = min(
-            apt_point.distance(pub_point) for pub_point in pub_points_shapely
-        )
-    else:
-        min_dist = np.inf
-    apartment_nearest_pub_distance.append(min_dist)
 
 fig = go.Figure()
 
@@ -118,8 +85,13 @@ building_type_colors = {
     "School": "orange",
 }
 
-for polygon_coords, building_type in zip(building_polygons_coords, building_types):
-    x_coords, y_coords = zip(*polygon_coords)
+# One filled trace per building type; footprints are NaN-separated rings
+valid_building_types = building_type_all[valid_buildings]
+for building_type in pd.unique(valid_building_types):
+    x_coords, y_coords = wkt.join_rings(
+        building_coords, building_offsets,
+        valid_buildings[valid_building_types == building_type],
+    )
     color = building_type_colors.get(building_type, "gray")
     fig.add_trace(
         go.Scatter(
@@ -136,9 +108,12 @@ for polygon_coords, building_type in zip(building_polygons_coords, building_type
         )
     )
 
-fig.write_image("./BaseMap.png")
+# Cached raster of the same footprints, redrawn only when the attribute files change
+city_base_map = base_map.load_base_map()
+if city_base_map is not None:
+    city_base_map.save_png("./BaseMap.png")
 
-x_apartments, y_apartments = zip(*apartment_points_coords)
+x_apartments, y_apartments = apartment_points_coords.T
 initial_apartment_hover_text = [
     f"Apartment ID: {apartment_id}<br>Rental Cost: ${rental_cost}"
     for apartment_id, rental_cost in zip(apartment_ids, rental_costs)
@@ -161,9 +136,7 @@ initial_apartment_trace_index = len(fig.data) - 1
 
 characteristic_apartment_hover_text = [
     f"Apartment ID: {apartment_ids[i]}<br>Rental Cost: ${rental_costs[i]}<br>"
-    f"Dist to Nearest Pub: {apartment_nearest_pub_distance[i]:.2f} units"
-    if apartment_nearest_pub_distance[i] != np.inf
-    else f"Apartment ID: {apartment_ids[i]}<br>Rental Cost: ${rental_costs[i]}<br>No pubs found nearby"
+    f"{nearest_amenity_text(i)}"
     for i in range(len(apartment_ids))
 ]
 fig.add_trace(
@@ -196,7 +169,7 @@ fig.add_trace(
 characteristic_apartment_trace_index = len(fig.data) - 1
 
 # --- Restaurants: Initial (purple dots, no colorbar) ---
-x_rest, y_rest = zip(*restaurant_points)
+x_rest, y_rest = restaurant_points.T
 initial_restaurant_hover_text = [f"Restaurant ID: {restid}" for restid in restaurant_ids]
 fig.add_trace(
     go.Scattergl(
@@ -248,7 +221,7 @@ fig.add_trace(
 characteristic_restaurant_trace_index = len(fig.data) - 1
 
 # --- Pubs: Initial (black dots) ---
-x_pubs, y_pubs = zip(*pub_points_coords)
+x_pubs, y_pubs = pub_points_coords.T
 initial_pub_hover_text = [
     f"Pub ID: {pubid}<br>Hourly Cost: ${hourlyRate}"
     for pubid, hourlyRate in zip(pub_ids, pub_hourly_costs)
@@ -307,7 +280,7 @@ fig.add_trace(
 characteristic_pub_trace_index = len(fig.data) - 1
 
 # --- Employers: Heatmap (NEW) ---
-x_employers, y_employers = zip(*employer_points_coords)
+x_employers, y_employers = employer_points_coords.T
 # Add a density heatmap for employer locations
 employer_heatmap = go.Histogram2d(
     x=x_employers,
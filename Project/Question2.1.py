@@ -1,28 +1,22 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
+
+import base_map
+import journals
+import log_store
+from intervals import join_intervals
 
 # --- 1. Load and preprocess data ---
-tj = pd.read_csv("VAST-Challenge-2022/Datasets/Journals/TravelJournal.csv")
-al = pd.read_csv("VAST-Challenge-2022/Datasets/Activity_Logs/ParticipantStatusLogs1.csv")
-
-tj["travelStartTime"] = pd.to_datetime(tj["travelStartTime"])
-tj["travelEndTime"] = pd.to_datetime(tj["travelEndTime"])
-al["timestamp"] = pd.to_datetime(al["timestamp"])
-
-# Extract x, y from WKT POINT
-al[["x", "y"]] = (
-    al["currentLocation"]
-    .str.replace("POINT \(", "", regex=True)
-    .str.replace("\)", "", regex=True)
-    .str.split(" ", expand=True)
-    .astype(float)
+# Epoch start/end times and categorical purpose from the journal store
+tj = journals.load_journal("TravelJournal", columns=["participantId", "travelStartTime", "travelEndTime", "purpose"])
+al = log_store.load_log_file(
+    "VAST-Challenge-2022/Datasets/Activity_Logs/ParticipantStatusLogs1.csv"
 )
 
-al = al[al["currentMode"] == "Transport"]
-al["day_name"] = al["timestamp"].dt.day_name()
-tj["day_name"] = tj["travelStartTime"].dt.day_name()
+al = al[al["currentMode"] == "Transport"].copy()
+al["day_name"] = log_store.to_datetime(al["timestamp"]).dt.day_name()
+tj["day_name"] = log_store.to_datetime(tj["travelStartTime"]).dt.day_name()
 
 days_of_interest = ["Tuesday", "Saturday"]
 tj = tj[tj["day_name"].isin(days_of_interest)]
@@ -32,40 +26,28 @@ al = al[al["day_name"].isin(days_of_interest)]
 purposes_of_interest = tj["purpose"].value_counts().index[:3]
 tj = tj[tj["purpose"].isin(purposes_of_interest)]
 
-def day_night(ts):
-    hour = ts.hour
-    return "Day" if 6 <= hour < 18 else "Night"
-
-# --- 2. Pre-group activity logs by participantId for fast lookup ---
-al_groups = {pid: group for pid, group in al.groupby("participantId")}
-
-# --- 3. Parallel aggregation of trajectories ---
-def process_trip(trip_row):
-    trip = trip_row[1]
-    pid = trip["participantId"]
-    if pid not in al_groups:
-        return None
-    al_pid = al_groups[pid]
-    mask = (
-        (al_pid["timestamp"] >= trip["travelStartTime"]) &
-        (al_pid["timestamp"] <= trip["travelEndTime"])
-    )
-    trip_points = al_pid.loc[mask, ["participantId", "timestamp", "x", "y", "day_name"]].copy()
-    if trip_points.empty:
-        return None
-    trip_points["purpose"] = trip["purpose"]
-    trip_points["trip_id"] = trip_row[0]
-    trip_points["time_of_day"] = trip_points["timestamp"].apply(day_night)
-    return trip_points
-
-agg_rows = []
-with ThreadPoolExecutor() as executor:
-    results = list(tqdm(
-        executor.map(process_trip, tj.iterrows()),
-        total=len(tj)
-    ))
-agg_rows = [r for r in results if r is not None]
-agg_df = pd.concat(agg_rows, ignore_index=True)
+# --- 2. Attach trips to transport log points in one (participantId, time) join ---
+point_rows, trip_rows = join_intervals(
+    al["participantId"].to_numpy(),
+    al["timestamp"].to_numpy(),
+    tj["participantId"].to_numpy(),
+    tj["travelStartTime"].to_numpy(),
+    tj["travelEndTime"].to_numpy(),
+)
+
+# --- 3. Aggregate trajectory points (ordered by trip, then time) ---
+agg_df = pd.DataFrame({
+    "participantId": al["participantId"].to_numpy()[point_rows],
+    "timestamp": al["timestamp"].to_numpy()[point_rows],
+    "x": al["x"].to_numpy()[point_rows],
+    "y": al["y"].to_numpy()[point_rows],
+    "day_name": al["day_name"].to_numpy()[point_rows],
+    "purpose": tj["purpose"].to_numpy()[trip_rows],
+    "trip_id": tj.index.to_numpy()[trip_rows],
+})
+agg_df["timestamp"] = log_store.to_datetime(agg_df["timestamp"])
+hours = agg_df["timestamp"].dt.hour
+agg_df["time_of_day"] = np.where((hours >= 6) & (hours < 18), "Day", "Night")
 
 purposes = list(agg_df["purpose"].unique())
 time_of_days = ["Day", "Night"]
@@ -176,6 +158,7 @@ daynight_buttons = [
 
 # --- 6. Build the figure ---
 fig = go.Figure(traces)
+base_map.add_to_figure(fig, base_map.load_base_map(), opacity=0.6)
 fig.update_layout(
     title="Actual Trajectories by Purpose, Time of Day, and Day",
     xaxis_title="X",
@@ -1,208 +1,186 @@
+import os
 import pandas as pd
 import plotly.graph_objects as go
-import glob
 from tqdm import tqdm
 import numpy as np
 
+import base_map
+import log_store
+import spatial
+import traffic_cube
+import wkt
+
 # --- Configuration ---
 DATA_DIR = "VAST-Challenge-2022/Datasets/"
 LOG_FILES_PATTERN = f"{DATA_DIR}/Activity_Logs/ParticipantStatusLogs*.csv"
-ATTRIBUTE_FILES = [
-    f"{DATA_DIR}/Attributes/Buildings.csv",
-    f"{DATA_DIR}/Attributes/Apartments.csv",
-    f"{DATA_DIR}/Attributes/Employers.csv",
-    f"{DATA_DIR}/Attributes/Pubs.csv",
-    f"{DATA_DIR}/Attributes/Restaurants.csv",
-    f"{DATA_DIR}/Attributes/Schools.csv",
-]
-
-# --- 1. Load Base Map Data ---
-base_map_points_list = []
-print("Creating base map from attribute files...")
-for file_path in ATTRIBUTE_FILES:
-    try:
-        if not glob.glob(file_path):
-            continue
-        df_attr = pd.read_csv(file_path)
-        if "location" in df_attr.columns:
-            point_locs = df_attr[
-                df_attr["location"].astype(str).str.startswith("POINT", na=False)
-            ].copy()
-            if not point_locs.empty:
-                coords = (
-                    point_locs["location"]
-                    .astype(str)
-                    .str.replace("POINT \\(", "", regex=True)
-                    .str.replace("\\)", "", regex=True)
-                    .str.split(" ", expand=True)
-                )
-                point_locs["x"] = pd.to_numeric(coords[0], errors="coerce")
-                point_locs["y"] = pd.to_numeric(coords[1], errors="coerce")
-                point_locs.dropna(subset=["x", "y"], inplace=True)
-                if not point_locs.empty:
-                    base_map_points_list.append(point_locs[["x", "y"]])
-    except pd.errors.EmptyDataError:
-        continue
-    except Exception as e:
-        print(f"Error processing attribute file {file_path}: {e}")
-
-base_map_trace = None
-if base_map_points_list:
-    base_map_df = pd.concat(base_map_points_list, ignore_index=True)
-    base_map_trace = go.Scattergl(
-        x=base_map_df["x"],
-        y=base_map_df["y"],
-        mode="markers",
-        marker=dict(size=2, color="lightgrey", opacity=0.5),
-        name="City Locations",
-        hoverinfo="none",
-        showlegend=False,
-    )
-    print(f"Added {len(base_map_df)} base map points.")
-else:
-    print("No base map points generated.")
-
-# --- 2. Process Traffic Data ---
-traffic_points_list = []
-log_files = glob.glob(LOG_FILES_PATTERN)
-if not log_files:
-    print(f"Error: No activity log files found: {LOG_FILES_PATTERN}")
-
-print(f"\nProcessing {len(log_files)} activity log files for traffic data...")
-for file_path in tqdm(log_files, desc="Processing Logs"):
-    try:
-        df_log = pd.read_csv(
-            file_path, usecols=["timestamp", "currentLocation", "currentMode"]
-        )
-        df_transport = df_log[df_log["currentMode"] == "Transport"].copy()
-        df_log = None
-
-        if not df_transport.empty:
-            coords = (
-                df_transport["currentLocation"]
-                .astype(str)
-                .str.replace("POINT \\(", "", regex=True)
-                .str.replace("\\)", "", regex=True)
-                .str.split(" ", expand=True)
-            )
-            df_transport["x"] = pd.to_numeric(coords[0], errors="coerce")
-            df_transport["y"] = pd.to_numeric(coords[1], errors="coerce")
-            df_transport.dropna(subset=["x", "y"], inplace=True)
+BUILDINGS_FILE = f"{DATA_DIR}/Attributes/Buildings.csv"
+TRAFFIC_CUBE_FILE = f"{DATA_DIR}/Cache/traffic_cube.npz"
+# Streaming mode reads the raw logs in chunks and bins them over the city
+# bounds, so peak memory does not grow with the number of log files.
+STREAM_LOGS = False
+LOG_CHUNK_SIZE = 500_000
+LOG_WORKERS = log_store.INGEST_WORKERS  # Processes used to parse or stream log files
+CITY_BOUNDS_PADDING = 0.02  # Fraction of the building extent added on each side
+# Nearest pub/restaurant/employer/school for every Transport log point. This
+# reads every log file from the cache, so it is off by default and skipped in
+# streaming mode.
+ENRICH_TRANSPORT_AMENITIES = False
+AMENITY_FILES = {
+    "pub": f"{DATA_DIR}/Attributes/Pubs.csv",
+    "restaurant": f"{DATA_DIR}/Attributes/Restaurants.csv",
+    "employer": f"{DATA_DIR}/Attributes/Employers.csv",
+    "school": f"{DATA_DIR}/Attributes/Schools.csv",
+}
+AMENITY_RADIUS = 250  # Points closer than this count as "near" an amenity
+
+
+def city_bounds(buildings_csv_path):
+    """Returns (x_min, x_max, y_min, y_max) of the building footprints, padded."""
+    buildings_df = pd.read_csv(buildings_csv_path)
+    coords, _, bad_rows = wkt.parse_polygons(buildings_df["location"])
+    wkt.report_bad_rows(buildings_csv_path, buildings_df["location"], bad_rows)
+    (x_min, y_min), (x_max, y_max) = coords.min(axis=0), coords.max(axis=0)
+    pad_x = (x_max - x_min) * CITY_BOUNDS_PADDING
+    pad_y = (y_max - y_min) * CITY_BOUNDS_PADDING
+    return x_min - pad_x, x_max + pad_x, y_min - pad_y, y_max + pad_y
 
+
+# --- 2. Bin Traffic Data into a (day, interval, y, x) density cube ---
+def load_transport_points(log_files):
+    """Returns the x, y and timestamp arrays of the Transport rows of the cached logs."""
+    traffic_points_list = []
+    print(f"\nProcessing {len(log_files)} activity log files for traffic data...")
+    log_store.ensure_cached(log_files, LOG_WORKERS)
+    for file_path in tqdm(log_files, desc="Processing Logs"):
+        try:
+            df_log = log_store.load_log_file(
+                file_path, columns=["timestamp", "x", "y", "currentMode"]
+            )
+            df_transport = df_log[df_log["currentMode"] == "Transport"]
+            df_log = None
+            df_transport = df_transport.dropna(subset=["x", "y"])
             if not df_transport.empty:
-                df_transport["timestamp"] = pd.to_datetime(
-                    df_transport["timestamp"], errors="coerce"
-                )
-                df_transport.dropna(subset=["timestamp"], inplace=True)
-                if not df_transport.empty:
-                    df_transport["hour_interval"] = (
-                        df_transport["timestamp"].dt.hour // 3 * 3
-                    )
-                    df_transport["day_name"] = df_transport[
-                        "timestamp"
-                    ].dt.day_name()
-                    traffic_points_list.append(
-                        df_transport[["x", "y", "hour_interval", "day_name"]]
-                    )
-    except pd.errors.EmptyDataError:
-        continue
-    except Exception as e:
-        print(f"Error processing log file {file_path}: {e}")
-
-if not traffic_points_list:
-    print("No traffic data processed.")
-    traffic_df = pd.DataFrame(columns=["x", "y", "hour_interval", "day_name"])
-else:
-    traffic_df = pd.concat(traffic_points_list, ignore_index=True)
+                traffic_points_list.append(df_transport[["x", "y", "timestamp"]])
+        except Exception as e:
+            print(f"Error processing log file {file_path}: {e}")
+
+    if traffic_points_list:
+        traffic_df = pd.concat(traffic_points_list, ignore_index=True)
+    else:
+        traffic_df = pd.DataFrame(columns=["x", "y", "timestamp"])
     traffic_points_list = None
     print(f"Total traffic points processed: {len(traffic_df)}")
+    return (
+        traffic_df["x"].to_numpy(dtype=np.float64),
+        traffic_df["y"].to_numpy(dtype=np.float64),
+        traffic_df["timestamp"].to_numpy(dtype=np.int64),
+    )
 
-# --- 3. Prepare Data and Traces for Heatmaps ---
-all_plotly_traces = []
-if base_map_trace:
-    all_plotly_traces.append(base_map_trace)
-
-heatmap_trace_metadata = []
-unique_days = ["NoData"]
-unique_intervals = [-1]
-initial_title_text = "Traffic Density Heatmap (No Data)"
-
-if not traffic_df.empty:
-    unique_days = sorted(traffic_df["day_name"].unique().tolist())
-    unique_intervals = sorted(traffic_df["hour_interval"].unique().tolist())
-
-    if not unique_days: unique_days = ["NoDataDay"]
-    if not unique_intervals: unique_intervals = [-1]
-
-    x_min, x_max = traffic_df["x"].min(), traffic_df["x"].max()
-    y_min, y_max = traffic_df["y"].min(), traffic_df["y"].max()
-    n_bins = 100
-    xbins = dict(
-        start=x_min,
-        end=x_max,
-        size=(x_max - x_min) / n_bins if n_bins > 0 and x_max > x_min else 1,
+
+def stream_density_cube(log_files, x_edges, y_edges):
+    print(
+        f"\nStreaming {len(log_files)} activity log files in chunks of {LOG_CHUNK_SIZE} rows "
+        f"on up to {LOG_WORKERS} processes..."
     )
-    ybins = dict(
-        start=y_min,
-        end=y_max,
-        size=(y_max - y_min) / n_bins if n_bins > 0 and y_max > y_min else 1,
+    density_cube, total_points, total_binned = traffic_cube.stream_log_files(
+        log_files, x_edges, y_edges, LOG_CHUNK_SIZE, LOG_WORKERS
     )
-
     print(
-        f"\nCreating {len(unique_days) * len(unique_intervals)} heatmap traces..."
+        f"Total traffic points processed: {total_points} "
+        f"({total_points - total_binned} outside the city bounds)"
     )
-    for day_val in unique_days:
-        for interval_val in unique_intervals:
-            df_subset = traffic_df[
-                (traffic_df["day_name"] == day_val)
-                & (traffic_df["hour_interval"] == interval_val)
-            ]
-            is_initially_visible = (
-                day_val == unique_days[0] and interval_val == unique_intervals[0]
-            )
-            current_trace = go.Histogram2d(
-                x=df_subset["x"],
-                y=df_subset["y"],
-                xbins=xbins,
-                ybins=ybins,
-                colorscale="Hot",
-                zsmooth="best",
-                name=f"{day_val} {interval_val:02d}h",
-                visible=is_initially_visible,
-                showscale=is_initially_visible,
-                hoverinfo="z",
-                # Store day and interval for easy filtering in visibility updates
-                customdata=np.array([[day_val, interval_val]] * len(df_subset)),
-                meta={"day": day_val, "interval": interval_val} # For easier access
-            )
-            all_plotly_traces.append(current_trace)
-            # Metadata for mapping (day, interval) to trace index in all_plotly_traces
-            heatmap_trace_metadata.append(
-                {
-                    "day": day_val,
-                    "interval": interval_val,
-                    "trace_index": len(all_plotly_traces) - 1,
-                }
-            )
-    if unique_days[0] != "NoData" and unique_intervals[0] != -1:
-        initial_title_text = (
-            f"Traffic: {unique_days[0]}, "
-            f"{unique_intervals[0]:02d}:00-"
-            f"{(unique_intervals[0] + 2):02d}:59"
+    return density_cube
+
+
+def update_density_cube(density_cube, x_edges, y_edges, new_files):
+    """Adds new log files to a saved cube in place; False if they fall outside its bins.
+
+    Streamed cubes use fixed city bounds. Cubes binned over the data extent
+    stay valid only while the new points lie within the old extent.
+    """
+    if STREAM_LOGS:
+        density_cube += stream_density_cube(new_files, x_edges, y_edges)
+        return True
+    x, y, timestamps = load_transport_points(new_files)
+    if len(x) and (
+        x.min() < x_edges[0] or x.max() > x_edges[-1] or y.min() < y_edges[0] or y.max() > y_edges[-1]
+    ):
+        print("New traffic points extend the binned extent, rebuilding the cube...")
+        return False
+    traffic_cube.accumulate(density_cube, x_edges, y_edges, x, y, timestamps)
+    return True
+
+
+def load_density_cube(log_files):
+    """Returns (density_cube, x_edges, y_edges), reusing the saved cube when current.
+
+    A saved cube is extended with the log files it does not contain yet, so
+    only newly arrived files are read.
+    """
+    if not STREAM_LOGS:
+        log_store.ensure_cached(log_files, LOG_WORKERS)
+    log_sources = log_store.source_signatures(log_files)
+    log_sources["_binning"] = "city_bounds" if STREAM_LOGS else "data_extent"
+    cached_cube = traffic_cube.load_cube(TRAFFIC_CUBE_FILE, log_sources)
+    if cached_cube is not None:
+        density_cube, x_edges, y_edges, new_sources = cached_cube
+        new_files = [f for f in log_files if os.path.basename(f) in new_sources]
+        if not new_files:
+            print(f"\nLoaded traffic density cube from {TRAFFIC_CUBE_FILE}.")
+            return density_cube, x_edges, y_edges
+        print(f"\nAdding {len(new_files)} new log files to the traffic density cube from {TRAFFIC_CUBE_FILE}.")
+        if update_density_cube(density_cube, x_edges, y_edges, new_files):
+            traffic_cube.save_cube(TRAFFIC_CUBE_FILE, density_cube, x_edges, y_edges, log_sources)
+            return density_cube, x_edges, y_edges
+
+    if STREAM_LOGS:
+        x_edges, y_edges = traffic_cube.make_edges(*city_bounds(BUILDINGS_FILE))
+        density_cube = stream_density_cube(log_files, x_edges, y_edges)
+    else:
+        density_cube, x_edges, y_edges = traffic_cube.build_cube(*load_transport_points(log_files))
+    traffic_cube.save_cube(TRAFFIC_CUBE_FILE, density_cube, x_edges, y_edges, log_sources)
+    return density_cube, x_edges, y_edges
+
+
+def transport_amenity_summary(log_files):
+    """Finds the nearest amenity of each type for every Transport log point.
+
+    Files are enriched one at a time from the log cache, so memory is bounded
+    by one file. Returns a frame with, per amenity type, the mean distance
+    to the nearest amenity and the share of points within AMENITY_RADIUS.
+    """
+    indexes = {name: spatial.load_amenity_index(path) for name, path in AMENITY_FILES.items()}
+    log_store.ensure_cached(log_files, LOG_WORKERS)
+    n_points = 0
+    distance_sums = dict.fromkeys(indexes, 0.0)
+    found = dict.fromkeys(indexes, 0)
+    near = dict.fromkeys(indexes, 0)
+    for file_path in tqdm(log_files, desc="Enriching transport points"):
+        df_log = log_store.load_log_file(file_path, columns=["x", "y", "currentMode"])
+        df_transport = df_log[df_log["currentMode"] == "Transport"].dropna(subset=["x", "y"])
+        if df_transport.empty:
+            continue
+        amenities = spatial.nearest_amenities(
+            df_transport[["x", "y"]].to_numpy(dtype=np.float64), indexes
         )
+        n_points += len(df_transport)
+        for name in indexes:
+            distances = amenities[f"{name}_distance"].to_numpy()
+            finite = np.isfinite(distances)
+            distance_sums[name] += distances[finite].sum()
+            found[name] += int(finite.sum())
+            near[name] += int((distances <= AMENITY_RADIUS).sum())
+    return pd.DataFrame({
+        "mean_distance": [distance_sums[n] / found[n] if found[n] else np.nan for n in indexes],
+        f"share_within_{AMENITY_RADIUS}": [near[n] / n_points if n_points else np.nan for n in indexes],
+    }, index=pd.Index(list(indexes), name="amenity"))
 
-# --- 4. Create Controls ---
-updatemenus_list = []
-sliders_list = []
 
 # Helper to generate visibility list and title object
 def get_visibility_and_title_args(
-    target_day, target_interval, all_traces_list, base_map_exists,
-    heatmap_meta_list
+    target_day, target_interval, all_traces_list, heatmap_meta_list
 ):
     visibility = [False] * len(all_traces_list)
-    if base_map_exists:
-        visibility[0] = True
 
     new_title_str = f"Traffic: {target_day}, {target_interval:02d}:00-{(target_interval + 2):02d}:59"
     
@@ -224,117 +202,188 @@ def get_visibility_and_title_args(
     return {"visible": visibility}, {"title.text": new_title_str}
 
 
-# Day Dropdown
-day_buttons_list = []
-if unique_days[0] != "NoData" and unique_intervals[0] != -1:
-    for day_idx, current_day_name in enumerate(unique_days):
-        # Action for this day button:
-        # 1. Set view to (current_day_name, first_interval)
-        # 2. Reset slider to first step
-        # 3. Reprogram ALL slider steps to use current_day_name
+if __name__ == "__main__":
+    # --- 1. Load Base Map (cached raster, shown as a layout image) ---
+    city_base_map = base_map.load_base_map()
 
-        first_interval_val = unique_intervals[0]
-        
-        # Args for the immediate update when this day button is clicked
-        vis_args_for_day_button, title_args_for_day_button = get_visibility_and_title_args(
-            current_day_name, first_interval_val, all_plotly_traces,
-            base_map_trace is not None, heatmap_trace_metadata
+    log_files = log_store.list_log_files(LOG_FILES_PATTERN)
+    if not log_files:
+        print(f"Error: No activity log files found: {LOG_FILES_PATTERN}")
+    density_cube, x_edges, y_edges = load_density_cube(log_files)
+    if ENRICH_TRANSPORT_AMENITIES and STREAM_LOGS:
+        print("\nSkipping the transport amenity summary in streaming mode (it needs the log cache).")
+    elif ENRICH_TRANSPORT_AMENITIES and log_files:
+        print("\nNearest amenities of the transport log points:")
+        print(transport_amenity_summary(log_files))
+
+    # --- 3. Prepare Traces for Heatmaps ---
+    all_plotly_traces = []
+
+    heatmap_trace_metadata = []
+    unique_days = ["NoData"]
+    unique_intervals = [-1]
+    initial_title_text = "Traffic Density Heatmap (No Data)"
+
+    day_totals = density_cube.sum(axis=(1, 2, 3))
+    interval_totals = density_cube.sum(axis=(0, 2, 3))
+    if day_totals.sum() > 0:
+        day_indices = np.flatnonzero(day_totals)
+        interval_indices = np.flatnonzero(interval_totals)
+        unique_days = [traffic_cube.DAY_NAMES[d] for d in day_indices]
+        unique_intervals = [traffic_cube.INTERVALS[i] for i in interval_indices]
+        x_centers = traffic_cube.bin_centers(x_edges)
+        y_centers = traffic_cube.bin_centers(y_edges)
+
+        print(
+            f"\nCreating {len(unique_days) * len(unique_intervals)} heatmap traces..."
+        )
+        for day_idx, day_val in zip(day_indices, unique_days):
+            for interval_idx, interval_val in zip(interval_indices, unique_intervals):
+                is_initially_visible = (
+                    day_val == unique_days[0] and interval_val == unique_intervals[0]
+                )
+                current_trace = go.Heatmap(
+                    z=density_cube[day_idx, interval_idx],
+                    x=x_centers,
+                    y=y_centers,
+                    colorscale="Hot",
+                    zsmooth="best",
+                    name=f"{day_val} {interval_val:02d}h",
+                    visible=is_initially_visible,
+                    showscale=is_initially_visible,
+                    hoverinfo="z",
+                    meta={"day": day_val, "interval": interval_val} # For easier access
+                )
+                all_plotly_traces.append(current_trace)
+                # Metadata for mapping (day, interval) to trace index in all_plotly_traces
+                heatmap_trace_metadata.append(
+                    {
+                        "day": day_val,
+                        "interval": interval_val,
+                        "trace_index": len(all_plotly_traces) - 1,
+                    }
+                )
+        initial_title_text = (
+            f"Traffic: {unique_days[0]}, "
+            f"{unique_intervals[0]:02d}:00-"
+            f"{(unique_intervals[0] + 2):02d}:59"
         )
 
-        # Prepare layout updates, including reprogramming slider steps
-        layout_updates_for_day_button = {
-            "title.text": title_args_for_day_button["title.text"],
-            "sliders[0].active": 0,  # Reset slider to first step
-        }
-
-        # Reprogram each slider step's args
-        for interval_s_idx, interval_s_val in enumerate(unique_intervals):
-            vis_args_slider, title_args_slider = get_visibility_and_title_args(
-                current_day_name, # THIS DAY
-                interval_s_val,   # Slider's interval
-                all_plotly_traces,
-                base_map_trace is not None,
+    # --- 4. Create Controls ---
+    updatemenus_list = []
+    sliders_list = []
+
+    # Day Dropdown
+    day_buttons_list = []
+    if unique_days[0] != "NoData" and unique_intervals[0] != -1:
+        for day_idx, current_day_name in enumerate(unique_days):
+            # Action for this day button:
+            # 1. Set view to (current_day_name, first_interval)
+            # 2. Reset slider to first step
+            # 3. Reprogram ALL slider steps to use current_day_name
+
+            first_interval_val = unique_intervals[0]
+        
+            # Args for the immediate update when this day button is clicked
+            vis_args_for_day_button, title_args_for_day_button = get_visibility_and_title_args(
+                current_day_name, first_interval_val, all_plotly_traces,
                 heatmap_trace_metadata
             )
-            # Path to update the specific slider step's args
-            layout_updates_for_day_button[f"sliders[0].steps[{interval_s_idx}].args"] = [
-                vis_args_slider, title_args_slider
-            ]
+
+            # Prepare layout updates, including reprogramming slider steps
+            layout_updates_for_day_button = {
+                "title.text": title_args_for_day_button["title.text"],
+                "sliders[0].active": 0,  # Reset slider to first step
+            }
+
+            # Reprogram each slider step's args
+            for interval_s_idx, interval_s_val in enumerate(unique_intervals):
+                vis_args_slider, title_args_slider = get_visibility_and_title_args(
+                    current_day_name, # THIS DAY
+                    interval_s_val,   # Slider's interval
+                    all_plotly_traces,
+                    heatmap_trace_metadata
+                )
+                # Path to update the specific slider step's args
+                layout_updates_for_day_button[f"sliders[0].steps[{interval_s_idx}].args"] = [
+                    vis_args_slider, title_args_slider
+                ]
         
-        day_buttons_list.append(
-            dict(
-                label=current_day_name,
-                method="update",
-                args=[
-                    vis_args_for_day_button, # Update data visibility
-                    layout_updates_for_day_button # Update layout (title, slider active, slider steps)
-                ],
+            day_buttons_list.append(
+                dict(
+                    label=current_day_name,
+                    method="update",
+                    args=[
+                        vis_args_for_day_button, # Update data visibility
+                        layout_updates_for_day_button # Update layout (title, slider active, slider steps)
+                    ],
+                )
             )
-        )
-    if day_buttons_list:
-        updatemenus_list.append(
-            dict(
-                type="dropdown", direction="down", x=0.01, y=1.12, showactive=True,
-                buttons=day_buttons_list, xanchor="left", yanchor="top", active=0,
-                pad={"t":5, "b":5}
+        if day_buttons_list:
+            updatemenus_list.append(
+                dict(
+                    type="dropdown", direction="down", x=0.01, y=1.12, showactive=True,
+                    buttons=day_buttons_list, xanchor="left", yanchor="top", active=0,
+                    pad={"t":5, "b":5}
+                )
             )
-        )
 
-# Interval Slider
-slider_steps_list = []
-if unique_intervals[0] != -1 and unique_days[0] != "NoData":
-    # Initial definition of slider steps. These will be reprogrammed by the day dropdown.
-    # For the initial state (before any dropdown click), they operate on unique_days[0].
-    initial_day_for_slider = unique_days[0]
-    for interval_idx, interval_val in enumerate(unique_intervals):
-        vis_arg_slider_step, title_arg_slider_step = get_visibility_and_title_args(
-            initial_day_for_slider, # Default to first day
-            interval_val,
-            all_plotly_traces,
-            base_map_trace is not None,
-            heatmap_trace_metadata
-        )
-        slider_steps_list.append(
-            dict(
-                label=f"{interval_val:02d}-{(interval_val + 2):02d}h",
-                method="update",
-                args=[vis_arg_slider_step, title_arg_slider_step],
+    # Interval Slider
+    slider_steps_list = []
+    if unique_intervals[0] != -1 and unique_days[0] != "NoData":
+        # Initial definition of slider steps. These will be reprogrammed by the day dropdown.
+        # For the initial state (before any dropdown click), they operate on unique_days[0].
+        initial_day_for_slider = unique_days[0]
+        for interval_idx, interval_val in enumerate(unique_intervals):
+            vis_arg_slider_step, title_arg_slider_step = get_visibility_and_title_args(
+                initial_day_for_slider, # Default to first day
+                interval_val,
+                all_plotly_traces,
+                heatmap_trace_metadata
             )
-        )
-    if slider_steps_list:
-        sliders_list.append(
-            dict(
-                active=0, # Corresponds to the first interval
-                currentvalue={"prefix": "Time: ", "font": {"size": 14}},
-                pad={"t": 10, "b":10},
-                steps=slider_steps_list,
-                x=0.5, xanchor="center", y=0.02, yanchor="top", len=0.9, lenmode='fraction'
+            slider_steps_list.append(
+                dict(
+                    label=f"{interval_val:02d}-{(interval_val + 2):02d}h",
+                    method="update",
+                    args=[vis_arg_slider_step, title_arg_slider_step],
+                )
             )
-        )
+        if slider_steps_list:
+            sliders_list.append(
+                dict(
+                    active=0, # Corresponds to the first interval
+                    currentvalue={"prefix": "Time: ", "font": {"size": 14}},
+                    pad={"t": 10, "b":10},
+                    steps=slider_steps_list,
+                    x=0.5, xanchor="center", y=0.02, yanchor="top", len=0.9, lenmode='fraction'
+                )
+            )
+
+    # --- 5. Create and Show Figure ---
+    fig = go.Figure(data=all_plotly_traces)
+    # Drawn above the heatmaps so buildings stay visible over dense cells
+    base_map.add_to_figure(fig, city_base_map, opacity=0.5, layer="above")
+
+    fig.update_layout(
+        title_text=initial_title_text,
+        title_x=0.5,
+        xaxis_title="X Coordinate",
+        yaxis_title="Y Coordinate",
+        yaxis=dict(scaleanchor="x", scaleratio=1, autorange=True), # Ensure autorange for y if x changes
+        xaxis=dict(autorange=True),
+        plot_bgcolor="white",
+        margin=dict(l=40, r=40, t=80, b=80), # Adjusted top margin for dropdown
+        updatemenus=updatemenus_list,
+        sliders=sliders_list,
+        legend=dict(traceorder="reversed", title_text="Layers", orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+
+    # Apply the reprogramming for the initially active day in the dropdown (day 0)
+    # This ensures the slider is correctly programmed on load for the first day.
+    if day_buttons_list and 'args' in day_buttons_list[0] and len(day_buttons_list[0]['args']) > 1:
+        initial_layout_updates = day_buttons_list[0]['args'][1]
+        fig.update_layout(initial_layout_updates)
+
 
-# --- 5. Create and Show Figure ---
-fig = go.Figure(data=all_plotly_traces)
-
-fig.update_layout(
-    title_text=initial_title_text,
-    title_x=0.5,
-    xaxis_title="X Coordinate",
-    yaxis_title="Y Coordinate",
-    yaxis=dict(scaleanchor="x", scaleratio=1, autorange=True), # Ensure autorange for y if x changes
-    xaxis=dict(autorange=True),
-    plot_bgcolor="white",
-    margin=dict(l=40, r=40, t=80, b=80), # Adjusted top margin for dropdown
-    updatemenus=updatemenus_list,
-    sliders=sliders_list,
-    legend=dict(traceorder="reversed", title_text="Layers", orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-)
-
-# Apply the reprogramming for the initially active day in the dropdown (day 0)
-# This ensures the slider is correctly programmed on load for the first day.
-if day_buttons_list and 'args' in day_buttons_list[0] and len(day_buttons_list[0]['args']) > 1:
-    initial_layout_updates = day_buttons_list[0]['args'][1]
-    fig.update_layout(initial_layout_updates)
-
-
-print("\nInteraction Note: Select a day from the dropdown. This will set the day context and also reprogram the interval slider to operate within that selected day.")
-fig.show()
+    print("\nInteraction Note: Select a day from the dropdown. This will set the day context and also reprogram the interval slider to operate within that selected day.")
+    fig.show()
@@ -0,0 +1,194 @@
+"""Cached raster of the city base map for Plotly figures.
+
+Building footprints and amenity locations from the attribute CSVs are drawn
+once with OpenCV into a transparent PNG under the cache directory. The PNG is
+keyed on a hash of the attribute files and redrawn only when they change.
+Figures show it as a layout.images background instead of carrying thousands
+of map points or footprint vertices in their traces.
+"""
+import base64
+import json
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import log_store
+import wkt
+
+# --- Configuration ---
+DATA_DIR = "VAST-Challenge-2022/Datasets/"
+ATTRIBUTES_DIR = f"{DATA_DIR}/Attributes"
+BUILDINGS_FILE = f"{ATTRIBUTES_DIR}/Buildings.csv"
+# Amenity file -> BGR marker color
+AMENITY_FILES = {
+    f"{ATTRIBUTES_DIR}/Apartments.csv": (0, 0, 255),
+    f"{ATTRIBUTES_DIR}/Employers.csv": (96, 96, 96),
+    f"{ATTRIBUTES_DIR}/Pubs.csv": (0, 0, 0),
+    f"{ATTRIBUTES_DIR}/Restaurants.csv": (128, 0, 128),
+    f"{ATTRIBUTES_DIR}/Schools.csv": (0, 165, 255),
+}
+# Building type -> BGR color, the Question1 palette
+BUILDING_COLORS = {
+    "Commercial": (255, 0, 0),
+    "Residental": (0, 128, 0),
+    "School": (0, 165, 255),
+}
+DEFAULT_BUILDING_COLOR = (128, 128, 128)
+BUILDING_FILL_ALPHA = 128  # Half-transparent fill, opaque outline
+IMAGE_FILE = f"{DATA_DIR}/Cache/base_map.png"
+META_FILE = f"{DATA_DIR}/Cache/base_map.json"
+IMAGE_WIDTH = 2000  # Pixels; the height follows the aspect ratio of the city
+PADDING = 0.02  # Fraction of the extent added on each side
+MARKER_RADIUS = 3
+RENDER_VERSION = 1
+
+
+def normalize_building_types(building_types):
+    """Maps raw buildingType values onto Residental/Commercial/School."""
+    raw = pd.Series(building_types).astype(str).str.strip().str.lower()
+    return np.select(
+        [raw.str.startswith("resid"), raw.str.startswith("comm"), raw.str.startswith("school")],
+        ["Residental", "Commercial", "School"],
+        default=raw,
+    )
+
+
+class BaseMap:
+    """A rendered base map image and the world extent (x_min, x_max, y_min, y_max) it covers."""
+
+    def __init__(self, image_file, bounds, width, height):
+        self.image_file = image_file
+        self.bounds = tuple(bounds)
+        self.width = width
+        self.height = height
+
+    def to_pixel(self, x, y):
+        """Converts world coordinates to (column, row) pixel coordinates."""
+        x_min, x_max, y_min, y_max = self.bounds
+        column = (np.asarray(x) - x_min) / (x_max - x_min) * self.width
+        row = (y_max - np.asarray(y)) / (y_max - y_min) * self.height
+        return column, row
+
+    def to_world(self, column, row):
+        """Converts (column, row) pixel coordinates back to world coordinates."""
+        x_min, x_max, y_min, y_max = self.bounds
+        x = x_min + np.asarray(column) / self.width * (x_max - x_min)
+        y = y_max - np.asarray(row) / self.height * (y_max - y_min)
+        return x, y
+
+    def data_uri(self):
+        with open(self.image_file, "rb") as f:
+            return "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
+
+    def save_png(self, file_path, background=(255, 255, 255)):
+        """Writes the map composited over an opaque BGR background color."""
+        image = cv2.imread(self.image_file, cv2.IMREAD_UNCHANGED).astype(np.float32)
+        alpha = image[:, :, 3:] / 255
+        opaque = image[:, :, :3] * alpha + np.array(background, dtype=np.float32) * (1 - alpha)
+        cv2.imwrite(file_path, np.round(opaque).astype(np.uint8))
+
+    def layout_image(self, opacity=1.0, layer="below"):
+        """Returns a layout.images entry that stretches the map over its world extent."""
+        x_min, x_max, y_min, y_max = self.bounds
+        return dict(
+            source=self.data_uri(),
+            xref="x", yref="y",
+            x=x_min, y=y_max,
+            sizex=x_max - x_min, sizey=y_max - y_min,
+            xanchor="left", yanchor="top",
+            sizing="stretch",
+            opacity=opacity,
+            layer=layer,
+        )
+
+
+def add_to_figure(fig, base_map, opacity=1.0, layer="below"):
+    """Adds base_map to fig as a layout image; does nothing if base_map is None."""
+    if base_map is not None:
+        fig.add_layout_image(base_map.layout_image(opacity, layer))
+
+
+def _render_key(files):
+    return {
+        "files": {os.path.basename(f): log_store.file_hash(f) for f in files},
+        "width": IMAGE_WIDTH,
+        "version": RENDER_VERSION,
+    }
+
+
+def _read_points(file_path):
+    df = pd.read_csv(file_path)
+    if "location" not in df.columns:
+        return np.empty((0, 2))
+    coords, bad_rows = wkt.parse_points(df["location"])
+    wkt.report_bad_rows(file_path, df["location"], bad_rows)
+    return coords[np.isfinite(coords).all(axis=1)]
+
+
+def render_base_map(image_file=IMAGE_FILE, width=IMAGE_WIDTH):
+    """Draws buildings and amenities into image_file, returns the BaseMap."""
+    buildings_df = pd.read_csv(BUILDINGS_FILE)
+    coords, offsets, bad_rows = wkt.parse_polygons(buildings_df["location"])
+    wkt.report_bad_rows(BUILDINGS_FILE, buildings_df["location"], bad_rows)
+    building_types = normalize_building_types(buildings_df["buildingType"])
+    amenities = {
+        f: _read_points(f) for f in AMENITY_FILES if os.path.exists(f)
+    }
+
+    all_points = np.concatenate([coords] + list(amenities.values()))
+    (x_min, y_min), (x_max, y_max) = all_points.min(axis=0), all_points.max(axis=0)
+    pad_x, pad_y = (x_max - x_min) * PADDING, (y_max - y_min) * PADDING
+    bounds = (x_min - pad_x, x_max + pad_x, y_min - pad_y, y_max + pad_y)
+    height = int(round(width * (bounds[3] - bounds[2]) / (bounds[1] - bounds[0])))
+    base_map = BaseMap(image_file, bounds, width, height)
+
+    image = np.zeros((height, width, 4), dtype=np.uint8)  # Transparent BGRA
+    column, row = base_map.to_pixel(coords[:, 0], coords[:, 1])
+    pixels = np.round(np.column_stack([column, row])).astype(np.int32)
+    polygons = np.split(pixels, offsets[1:-1])
+    valid = np.diff(offsets) >= 3
+    for building_type in pd.unique(building_types[valid]):
+        rows = np.flatnonzero(valid & (building_types == building_type))
+        rings = [polygons[i].reshape(-1, 1, 2) for i in rows]
+        color = BUILDING_COLORS.get(building_type, DEFAULT_BUILDING_COLOR)
+        cv2.fillPoly(image, rings, color + (BUILDING_FILL_ALPHA,))
+        cv2.polylines(image, rings, True, color + (255,), 1)
+    for file_path, points in amenities.items():
+        column, row = base_map.to_pixel(points[:, 0], points[:, 1])
+        color = AMENITY_FILES[file_path] + (255,)
+        for center in np.round(np.column_stack([column, row])).astype(int):
+            cv2.circle(image, (int(center[0]), int(center[1])), MARKER_RADIUS, color, -1)
+
+    os.makedirs(os.path.dirname(image_file), exist_ok=True)
+    cv2.imwrite(image_file, image)
+    return base_map
+
+
+def load_base_map():
+    """Returns the cached BaseMap, rendering it first if the attribute files changed.
+
+    Returns None when the buildings file is missing.
+    """
+    if not os.path.exists(BUILDINGS_FILE):
+        print(f"Warning: {BUILDINGS_FILE} not found, no base map.")
+        return None
+    files = [BUILDINGS_FILE] + [f for f in AMENITY_FILES if os.path.exists(f)]
+    key = _render_key(files)
+    if os.path.exists(META_FILE) and os.path.exists(IMAGE_FILE):
+        with open(META_FILE) as f:
+            meta = json.load(f)
+        if meta["key"] == key:
+            return BaseMap(IMAGE_FILE, meta["bounds"], meta["width"], meta["height"])
+
+    print("Rendering base map from attribute files...")
+    base_map = render_base_map()
+    with open(META_FILE, "w") as f:
+        json.dump({
+            "key": key,
+            "bounds": [float(b) for b in base_map.bounds],
+            "width": base_map.width,
+            "height": base_map.height,
+        }, f, indent=1)
+    return base_map
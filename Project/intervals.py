@@ -0,0 +1,46 @@
+"""Vectorized interval join between timestamped points and time intervals.
+
+Used to attach TravelJournal trips to the activity log rows recorded while
+each trip was under way, without one boolean mask per trip.
+"""
+import numpy as np
+
+
+def _composite_codes(keys, times, key_values, time_values):
+    # Dense ranks keep (key, time) ordering in a single int64 without overflow
+    key_ranks = np.searchsorted(key_values, keys)
+    time_ranks = np.searchsorted(time_values, times)
+    return key_ranks.astype(np.int64) * (len(time_values) + 1) + time_ranks
+
+
+def join_intervals(point_keys, point_times, interval_keys, interval_starts, interval_ends):
+    """Matches points to the intervals that contain them.
+
+    A point matches an interval with the same key (e.g. participantId) when
+    start <= time <= end. Points are sorted once by (key, time) and every
+    interval is turned into a row range with two searchsorted calls.
+    Returns (point_rows, interval_rows), ordered by interval and then time;
+    a point covered by several intervals appears once per interval.
+    """
+    point_keys, point_times = np.asarray(point_keys), np.asarray(point_times)
+    interval_keys = np.asarray(interval_keys)
+    interval_starts, interval_ends = np.asarray(interval_starts), np.asarray(interval_ends)
+
+    key_values = np.unique(np.concatenate([point_keys, interval_keys]))
+    time_values = np.unique(np.concatenate([point_times, interval_starts, interval_ends]))
+    point_codes = _composite_codes(point_keys, point_times, key_values, time_values)
+    order = np.argsort(point_codes, kind="stable")
+    sorted_codes = point_codes[order]
+
+    lo = np.searchsorted(
+        sorted_codes, _composite_codes(interval_keys, interval_starts, key_values, time_values), side="left"
+    )
+    hi = np.searchsorted(
+        sorted_codes, _composite_codes(interval_keys, interval_ends, key_values, time_values), side="right"
+    )
+    counts = np.maximum(hi - lo, 0)
+
+    interval_rows = np.repeat(np.arange(len(interval_keys)), counts)
+    first_output = np.cumsum(counts) - counts
+    sorted_rows = np.repeat(lo - first_output, counts) + np.arange(counts.sum())
+    return order[sorted_rows], interval_rows
@@ -0,0 +1,152 @@
+"""Preprocessed journal store and time-sorted journal tables.
+
+Journal time columns are converted once to int64 UTC epoch nanoseconds, the
+same representation as the log cache, and every table is sorted by its time
+column. The rows in any [start, end) window are then one contiguous slice
+found with two searchsorted calls, instead of comparing per-row date objects
+over the whole journal.
+
+load_journal() parses each journal CSV only once into an uncompressed
+Feather file under JOURNAL_CACHE_DIR, with categorical text columns and
+precomputed durations, and memory-maps it on later runs. A JSON sidecar
+records the size and mtime of the CSV so the cache is rebuilt when it changes.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import log_store
+
+# --- Configuration ---
+JOURNALS_DIR = f"{log_store.DATA_DIR}/Journals"
+JOURNAL_CACHE_DIR = f"{log_store.DATA_DIR}/Cache/Journals"
+JOURNAL_CACHE_VERSION = 1
+# Journal name -> epoch time columns; the first one is the sort/index column
+TIME_COLUMNS = {
+    "TravelJournal": ["travelStartTime", "travelEndTime"],
+    "FinancialJournal": ["timestamp"],
+    "CheckinJournal": ["timestamp"],
+}
+# Journal name -> low-cardinality text columns stored as categories
+CATEGORY_COLUMNS = {
+    "TravelJournal": ["purpose"],
+    "FinancialJournal": ["category"],
+    "CheckinJournal": ["venueType"],
+}
+
+
+def read_journal(file_path, time_columns, usecols=None):
+    """Reads a journal CSV with its time_columns as int64 UTC epoch nanoseconds."""
+    journal = pd.read_csv(file_path, usecols=usecols)
+    for column in time_columns:
+        journal[column] = log_store.to_epoch(journal[column])
+    return journal
+
+
+class JournalIndex:
+    """A journal sorted by one epoch time column with O(log n) window slicing.
+
+    end_column optionally names the epoch end time of interval rows (e.g.
+    travelEndTime), enabling overlapping() for rows that start before a window.
+    """
+
+    def __init__(self, journal, time_column, end_column=None):
+        if journal[time_column].is_monotonic_increasing:
+            # Already sorted (e.g. the journal store); keep the memory-mapped frame
+            self.journal = journal.reset_index(drop=True)
+        else:
+            order = np.argsort(journal[time_column].to_numpy(), kind="stable")
+            self.journal = journal.iloc[order].reset_index(drop=True)
+        self.time_column = time_column
+        self.end_column = end_column
+        self._times = self.journal[time_column].to_numpy()
+        self._max_duration = 0
+        if end_column is not None and len(self.journal):
+            self._max_duration = int(np.max(self.journal[end_column].to_numpy() - self._times))
+
+    def __len__(self):
+        return len(self.journal)
+
+    def row_range(self, start=None, end=None):
+        """Returns (lo, hi) row bounds of the rows whose time is in [start, end)."""
+        lo = 0 if start is None else int(np.searchsorted(self._times, start, side="left"))
+        hi = len(self._times) if end is None else int(np.searchsorted(self._times, end, side="left"))
+        return lo, max(lo, hi)
+
+    def rows(self, start=None, end=None):
+        """Returns the rows whose time is in [start, end) as a slice of the sorted journal."""
+        lo, hi = self.row_range(start, end)
+        return self.journal.iloc[lo:hi]
+
+    def overlapping(self, start, end):
+        """Returns interval rows starting before end and ending at or after start."""
+        candidates = self.rows(start - self._max_duration, end)
+        return candidates[candidates[self.end_column].to_numpy() >= start]
+
+
+# --- Journal store ---
+def journal_file(name):
+    return f"{JOURNALS_DIR}/{name}.csv"
+
+
+def _journal_cache_path(name):
+    return f"{JOURNAL_CACHE_DIR}/{name}.feather"
+
+
+def _journal_signature(name):
+    stat = os.stat(journal_file(name))
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "version": JOURNAL_CACHE_VERSION}
+
+
+def parse_journal(name):
+    """Parses a journal CSV into the typed, time-sorted store schema.
+
+    TravelJournal additionally gets durationMinutes (travelEndTime -
+    travelStartTime).
+    """
+    journal = read_journal(journal_file(name), TIME_COLUMNS[name])
+    for column in CATEGORY_COLUMNS[name]:
+        if column in journal:
+            journal[column] = journal[column].astype("category")
+    if "participantId" in journal:
+        journal["participantId"] = journal["participantId"].astype(np.int32)
+    if name == "TravelJournal":
+        journal["durationMinutes"] = (journal["travelEndTime"] - journal["travelStartTime"]) / 60e9
+    order = np.argsort(journal[TIME_COLUMNS[name][0]].to_numpy(), kind="stable")
+    return journal.iloc[order].reset_index(drop=True)
+
+
+def ensure_journal_cached(name):
+    """Builds the Feather copy of a journal if it is missing or its CSV changed."""
+    cache_file = _journal_cache_path(name)
+    meta_file = f"{JOURNAL_CACHE_DIR}/{name}.json"
+    signature = _journal_signature(name)
+    if os.path.exists(meta_file) and os.path.exists(cache_file):
+        with open(meta_file) as f:
+            if json.load(f) == signature:
+                return
+    print(f"  Caching {journal_file(name)}...")
+    os.makedirs(JOURNAL_CACHE_DIR, exist_ok=True)
+    # Uncompressed so the file can be memory-mapped without decoding
+    journal = parse_journal(name)
+    log_store.replace_atomically(
+        cache_file, lambda tmp_file: journal.to_feather(tmp_file, compression="uncompressed")
+    )
+    log_store.write_json(meta_file, signature)
+
+
+def load_journal(name, columns=None):
+    """Loads a preprocessed journal ("TravelJournal", ...) sorted by its time column."""
+    ensure_journal_cached(name)
+    return log_store.read_mapped(_journal_cache_path(name), columns=columns)
+
+
+def load_journal_index(name, columns=None):
+    """Returns a JournalIndex over a preprocessed journal."""
+    time_column = TIME_COLUMNS[name][0]
+    end_column = "travelEndTime" if name == "TravelJournal" else None
+    if columns is not None:
+        columns = list(dict.fromkeys([time_column] + ([end_column] if end_column else []) + list(columns)))
+    return JournalIndex(load_journal(name, columns), time_column, end_column=end_column)
@@ -0,0 +1,59 @@
+"""Participant/time index over cached activity logs.
+
+The logs are sorted once by (participantId, timestamp); after that the rows
+of any participant in any time window are a contiguous slice found with two
+binary searches, so no query has to scan the full frame.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+import log_store
+
+
+def day_range(target_date, num_days=1):
+    """Returns the [start, end) epoch range covering whole UTC days."""
+    start = datetime.combine(target_date, time.min)
+    end = start + timedelta(days=num_days)
+    return tuple(log_store.to_epoch([start, end]))
+
+
+class LogIndex:
+    """Activity logs sorted by (participantId, timestamp) with O(log n) slicing.
+
+    time_column selects another epoch column to index on, e.g. "start" for
+    the segment table of segments.py.
+    """
+
+    def __init__(self, logs, time_column="timestamp"):
+        order = np.lexsort((logs[time_column].to_numpy(), logs["participantId"].to_numpy()))
+        self.logs = logs.iloc[order].reset_index(drop=True)
+        self._pids = self.logs["participantId"].to_numpy()
+        self._timestamps = self.logs[time_column].to_numpy()
+
+    def row_range(self, participant_id, start=None, end=None):
+        """Returns (lo, hi) row bounds for a participant within [start, end)."""
+        lo = np.searchsorted(self._pids, participant_id, side="left")
+        hi = np.searchsorted(self._pids, participant_id, side="right")
+        timestamps = self._timestamps[lo:hi]
+        first = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+        last = len(timestamps) if end is None else np.searchsorted(timestamps, end, side="left")
+        return int(lo + first), int(lo + max(first, last))
+
+    def rows(self, participant_id, start=None, end=None):
+        """Returns the log rows of a participant within [start, end), sorted by time."""
+        lo, hi = self.row_range(participant_id, start, end)
+        return self.logs.iloc[lo:hi]
+
+    def count(self, participant_id, start=None, end=None):
+        lo, hi = self.row_range(participant_id, start, end)
+        return hi - lo
+
+    def participants(self, start=None, end=None):
+        """Returns the participant ids with at least one log row in [start, end)."""
+        in_window = np.ones(len(self._timestamps), dtype=bool)
+        if start is not None:
+            in_window &= self._timestamps >= start
+        if end is not None:
+            in_window &= self._timestamps < end
+        return np.unique(self._pids[in_window])
@@ -0,0 +1,404 @@
+"""Columnar on-disk cache for the ParticipantStatusLogs*.csv activity logs.
+
+Every log file is parsed once into an uncompressed Feather (Arrow IPC) file
+under CACHE_DIR with typed columns: int32 participantId, int64 epoch
+timestamp (nanoseconds, UTC), float32 x/y and a categorical currentMode.
+Cached files are memory-mapped on load. For a single file, the plain numeric
+columns become zero-copy NumPy/pandas views of the mapping, so processes
+and scripts that load the same file share its pages in the OS page cache.
+Nullable Int32 and categorical columns are converted into private memory,
+and concatenating several files (concat_logs) copies everything. Cache
+files and the manifest are written to a temp file and renamed into place,
+so concurrent scripts never read a half-written file.
+
+A JSON manifest records the size and mtime of each source CSV so a cached
+copy is rebuilt as soon as the CSV changes, plus the first and last timestamp
+of each file so callers can open only the files that cover a date window
+(files_covering()). Stale files are parsed in parallel across a process pool;
+scripts that load logs must therefore keep their work under an
+``if __name__ == "__main__":`` guard (spawned workers re-import them).
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+import wkt
+
+# --- Configuration ---
+DATA_DIR = "VAST-Challenge-2022/Datasets/"
+LOG_FILES_PATTERN = f"{DATA_DIR}/Activity_Logs/ParticipantStatusLogs*.csv"
+CACHE_DIR = f"{DATA_DIR}/Cache/Activity_Logs"
+MANIFEST_FILE = f"{CACHE_DIR}/manifest.json"
+CACHE_VERSION = 3  # 2: uncompressed for memory mapping, 3: status columns
+INGEST_WORKERS = os.cpu_count() or 1
+
+# Fixed category orders so codes are identical across cached files
+LOG_MODES = ["AtHome", "Transport", "AtWork", "AtRestaurant", "AtRecreation"]
+HUNGER_STATUSES = ["JustAte", "BecameFull", "BecomingHungry", "Hungry", "Starving"]
+SLEEP_STATUSES = ["Awake", "PrepareToSleep", "Sleeping"]
+FINANCIAL_STATUSES = ["Stable", "Unstable"]
+# Declared cache schema: column -> dtype, or the category list of a categorical
+# column. x/y come from the currentLocation WKT points; timestamp is int64
+# epoch nanoseconds (UTC). The ID columns may be missing, hence nullable.
+LOG_SCHEMA = {
+    "participantId": np.int32,
+    "timestamp": np.int64,
+    "x": np.float32,
+    "y": np.float32,
+    "currentMode": LOG_MODES,
+    "hungerStatus": HUNGER_STATUSES,
+    "sleepStatus": SLEEP_STATUSES,
+    "apartmentId": "Int32",
+    "availableBalance": np.float32,
+    "jobId": "Int32",
+    "financialStatus": FINANCIAL_STATUSES,
+    "dailyFoodBudget": np.float32,
+    "weeklyExtraBudget": np.float32,
+}
+LOG_COLUMNS = list(LOG_SCHEMA)
+# Columns every log CSV must have; the others are filled with missing values
+REQUIRED_CSV_COLUMNS = ["timestamp", "currentLocation", "participantId", "currentMode"]
+
+
+def natsort_key(s):
+    return [int(text) if text.isdigit() else text.lower()
+            for text in re.split(r'([0-9]+)', s)]
+
+
+def list_log_files(pattern=LOG_FILES_PATTERN):
+    """Returns the activity log files in natural (numeric) order."""
+    return sorted(glob.glob(pattern), key=natsort_key)
+
+
+def to_epoch(timestamps):
+    """Converts timestamp strings or datetimes to int64 UTC epoch nanoseconds."""
+    return pd.to_datetime(timestamps, utc=True).to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def to_datetime(epoch):
+    """Converts int64 epoch nanoseconds back to tz-aware UTC datetimes."""
+    return pd.to_datetime(epoch, unit="ns", utc=True)
+
+
+def read_raw_log(file_path):
+    """Reads the schema columns of a log CSV with the default pandas dtypes."""
+    wanted = set(LOG_SCHEMA) | set(REQUIRED_CSV_COLUMNS)
+    try:
+        raw = pd.read_csv(file_path, usecols=lambda column: column in wanted)
+    except pd.errors.EmptyDataError:
+        print(f"  Warning: {file_path} is empty.")
+        raw = pd.DataFrame(columns=REQUIRED_CSV_COLUMNS)
+    missing = [column for column in REQUIRED_CSV_COLUMNS if column not in raw.columns]
+    if missing:
+        raise ValueError(f"{file_path} is missing the log columns {missing}.")
+    return raw
+
+
+def _categorical(values, categories, file_path, column):
+    values = pd.Series(values).fillna("").astype(str)
+    unknown = sorted(set(values.unique()) - set(categories) - {""})
+    if unknown:
+        print(f"  Warning: {file_path} has unexpected {column} values {unknown}.")
+    return pd.Categorical(values.replace("", np.nan), categories=categories + unknown)
+
+
+def apply_log_schema(raw, file_path):
+    """Converts a raw log frame to the typed columns of LOG_SCHEMA."""
+    coords, bad_rows = wkt.parse_points(raw["currentLocation"])
+    wkt.report_bad_rows(file_path, raw["currentLocation"], bad_rows)
+    columns = {
+        "participantId": raw["participantId"].to_numpy(dtype=np.int32),
+        "timestamp": to_epoch(raw["timestamp"]),
+        "x": coords[:, 0].astype(np.float32),
+        "y": coords[:, 1].astype(np.float32),
+    }
+    for column, dtype in LOG_SCHEMA.items():
+        if column in columns:
+            continue
+        values = raw[column] if column in raw.columns else pd.Series(np.nan, index=raw.index)
+        if isinstance(dtype, list):
+            columns[column] = _categorical(values, dtype, file_path, column)
+        else:
+            columns[column] = pd.to_numeric(values).astype(dtype).array
+    return pd.DataFrame(columns)
+
+
+def parse_log_file(file_path):
+    """Parses one raw log CSV into the typed cache schema."""
+    return apply_log_schema(read_raw_log(file_path), file_path)
+
+
+def _megabytes(num_bytes):
+    return f"{num_bytes / 2**20:.1f} MB"
+
+
+def _file_signature(file_path):
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "version": CACHE_VERSION}
+
+
+def file_hash(file_path, size=None):
+    """Returns the sha256 hex digest of a file, or of its first size bytes, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while size is None or size > 0:
+            block = f.read(2**20 if size is None else min(2**20, size))
+            if not block:
+                break
+            digest.update(block)
+            if size is not None:
+                size -= len(block)
+    return digest.hexdigest()
+
+
+def source_signatures(files):
+    """Returns {file name: [size, sha256 or mtime]} for files, to key derived caches on.
+
+    Cached files are identified by the content hash recorded in the manifest,
+    so derived caches survive a touched but unchanged log file; call
+    ensure_cached() first to get hashes. Other files fall back to their mtime.
+    """
+    manifest = load_manifest()
+    signatures = {}
+    for file_path in files:
+        stat = os.stat(file_path)
+        name = os.path.basename(file_path)
+        entry = manifest.get(name)
+        if entry is not None and "sha256" in entry and _is_fresh(file_path, manifest):
+            signatures[name] = [stat.st_size, entry["sha256"]]
+        else:
+            signatures[name] = [stat.st_size, stat.st_mtime]
+    return signatures
+
+
+def _cache_path(file_path):
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return f"{CACHE_DIR}/{name}.feather"
+
+
+def read_mapped(file_path, columns=None):
+    """Reads a Feather file memory-mapped; numeric columns stay views of the mapping.
+
+    Only uncompressed files are zero-copy; compressed ones are decoded into
+    private memory as with pd.read_feather.
+    """
+    table = feather.read_table(file_path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def load_manifest():
+    """Returns the cache manifest, keyed by log file name."""
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE) as f:
+        return json.load(f)
+
+
+def replace_atomically(file_path, write):
+    """Calls write(temp_path) and then renames the temp file over file_path.
+
+    The temp file is unique to this call and lives next to file_path, so
+    concurrent writers never share it and readers (including memory maps)
+    only ever see a complete old or new file.
+    """
+    directory = os.path.dirname(file_path) or "."
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_file)
+        os.replace(tmp_file, file_path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def write_json(file_path, data):
+    """Writes data as indented JSON via replace_atomically()."""
+    def write(tmp_file):
+        with open(tmp_file, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+    replace_atomically(file_path, write)
+
+
+def _save_manifest(manifest):
+    write_json(MANIFEST_FILE, manifest)
+
+
+def _is_fresh(file_path, manifest):
+    entry = manifest.get(os.path.basename(file_path))
+    if entry is None or not os.path.exists(_cache_path(file_path)):
+        return False
+    signature = _file_signature(file_path)
+    return all(entry.get(key) == value for key, value in signature.items())
+
+
+def map_files(function, files, workers=INGEST_WORKERS):
+    """Applies a picklable function to every file across a process pool.
+
+    Results come back in the order of files (natsort order for
+    list_log_files), whichever worker finishes first. With one worker or one
+    file everything runs in this process.
+    """
+    files = list(files)
+    workers = min(workers, len(files))
+    if workers <= 1:
+        return [function(f) for f in files]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, files))
+
+
+def ingest_log_file(file_path):
+    """Parses a log CSV into its Feather cache file and returns its manifest entry."""
+    print(f"  Caching {file_path}...")
+    raw = read_raw_log(file_path)
+    df = apply_log_schema(raw, file_path)
+    replace_atomically(
+        _cache_path(file_path), lambda tmp_file: df.to_feather(tmp_file, compression="uncompressed")
+    )
+    entry = _file_signature(file_path)
+    entry["sha256"] = file_hash(file_path)
+    entry["rows"] = len(df)
+    entry["raw_bytes"] = int(raw.memory_usage(deep=True).sum())
+    entry["bytes"] = int(df.memory_usage(deep=True).sum())
+    entry["ts_min"] = int(df["timestamp"].min()) if len(df) else None
+    entry["ts_max"] = int(df["timestamp"].max()) if len(df) else None
+    return entry
+
+
+def _same_content(file_path, manifest):
+    """True if a file whose mtime changed still has the size and hash it was cached with."""
+    entry = manifest.get(os.path.basename(file_path))
+    if entry is None or entry.get("version") != CACHE_VERSION or not os.path.exists(_cache_path(file_path)):
+        return False
+    return entry.get("size") == os.path.getsize(file_path) and entry.get("sha256") == file_hash(file_path)
+
+
+def ensure_cached(files, workers=INGEST_WORKERS):
+    """Builds the cache for any file that is new or whose content changed.
+
+    Files that were only touched (same size and sha256) keep their cached
+    copy, so appending log files costs time proportional to the new files.
+    Workers each write their own Feather file; only this process touches the
+    manifest.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    manifest = load_manifest()
+    stale_files = [f for f in files if not _is_fresh(f, manifest)]
+    touched_files = [f for f in stale_files if _same_content(f, manifest)]
+    for file_path in touched_files:
+        manifest[os.path.basename(file_path)].update(_file_signature(file_path))
+    stale_files = [f for f in stale_files if f not in touched_files]
+    if touched_files and not stale_files:
+        _save_manifest(manifest)
+    if stale_files:
+        num_new = sum(os.path.basename(f) not in manifest for f in stale_files)
+        print(
+            f"  Caching {num_new} new and {len(stale_files) - num_new} changed log files "
+            f"({len(files) - len(stale_files)} up to date) on up to {workers} processes..."
+        )
+        entries = map_files(ingest_log_file, stale_files, workers)
+        for file_path, entry in zip(stale_files, entries):
+            manifest[os.path.basename(file_path)] = entry
+        _save_manifest(manifest)
+        print_memory_report(entries)
+    return manifest
+
+
+def print_memory_report(entries):
+    """Prints the in-memory size of logs as parsed from CSV and in the cache schema."""
+    raw_bytes = sum(entry.get("raw_bytes", 0) for entry in entries)
+    schema_bytes = sum(entry.get("bytes", 0) for entry in entries)
+    if raw_bytes:
+        print(
+            f"  Log memory: {_megabytes(raw_bytes)} as read from CSV, "
+            f"{_megabytes(schema_bytes)} in the cache schema ({1 - schema_bytes / raw_bytes:.0%} less)."
+        )
+
+
+def _probe_time_range(file_path):
+    """Returns (first, last) epoch timestamps of a time-ordered log CSV.
+
+    Only the header, the first row and the tail of the file are read.
+    """
+    with open(file_path, "rb") as f:
+        header = f.readline().decode().strip().split(",")
+        first_line = f.readline().decode().strip()
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 65536))
+        tail = [line for line in f.read().decode(errors="ignore").splitlines() if line.strip()]
+    if "timestamp" not in header or not first_line:
+        return None, None
+    column = header.index("timestamp")
+    first, last = to_epoch([first_line.split(",")[column], tail[-1].split(",")[column]])
+    return int(first), int(last)
+
+
+def file_time_ranges(files):
+    """Returns {file: (ts_min, ts_max)} from the manifest, probing files it does not cover.
+
+    Empty files map to (None, None).
+    """
+    manifest = load_manifest()
+    ranges = {}
+    for file_path in files:
+        entry = manifest.get(os.path.basename(file_path))
+        if entry is not None and "ts_min" in entry and _is_fresh(file_path, manifest):
+            ranges[file_path] = (entry["ts_min"], entry["ts_max"])
+        else:
+            ranges[file_path] = _probe_time_range(file_path)
+    return ranges
+
+
+def files_covering(start, end, files=None):
+    """Returns the log files with rows in the epoch window [start, end), in file order."""
+    if files is None:
+        files = list_log_files()
+    return [
+        file_path for file_path, (ts_min, ts_max) in file_time_ranges(files).items()
+        if ts_min is not None and ts_min < end and ts_max >= start
+    ]
+
+
+def load_log_file(file_path, columns=None):
+    """Loads one activity log from the cache, building it first if needed."""
+    ensure_cached([file_path])
+    return read_mapped(_cache_path(file_path), columns=columns)
+
+
+def concat_logs(frames):
+    """Concatenates cached log frames, keeping the categorical columns categorical.
+
+    A single frame is returned as is (still backed by the memory map); with
+    several frames pd.concat copies the data into private memory.
+    """
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    if len(frames) == 1:
+        return frames[0]  # Keep a single memory-mapped frame uncopied
+    columns = list(frames[0].columns)
+    categorical = [column for column in columns if isinstance(frames[0][column].dtype, pd.CategoricalDtype)]
+    logs = pd.concat([df.drop(columns=categorical) for df in frames], ignore_index=True)
+    # pd.concat falls back to object dtype when category sets differ
+    for column in categorical:
+        logs[column] = pd.api.types.union_categoricals([df[column] for df in frames])
+    return logs[columns]
+
+
+def load_logs(files=None, columns=None):
+    """Loads and concatenates cached activity logs in the given file order."""
+    if files is None:
+        files = list_log_files()
+    ensure_cached(files)
+    return concat_logs(
+        [read_mapped(_cache_path(f), columns=columns) for f in files]
+    )
@@ -0,0 +1,239 @@
+"""Single-pass early/late comparative aggregation for Question4.
+
+Periods are named, non-overlapping date ranges. Every log file and journal
+is read once; each row is assigned to its period with one searchsorted over
+the period bounds and added to small per-period accumulators for all
+hypotheses at the same time:
+
+- AtRecreation log rows by hour of day and day of week
+- weekday AtWork log rows and the participant-days they fall on
+- Work/Home Commute count and minutes, total travel count and hours
+- travel purpose counts
+- spending (negative amounts) by category
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import log_store
+from log_index import day_range
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+COMMUTE_PURPOSE = "Work/Home Commute"
+LOG_INTERVAL_MINUTES = 5
+
+_NS_PER_SECOND = 1_000_000_000
+_NS_PER_DAY = 86400 * _NS_PER_SECOND
+_DAY_BITS = 20  # participant-day keys are participantId << 20 | days since epoch
+
+
+def default_periods(files, num_files):
+    """Returns Early/Late periods spanning the first and last num_files log files.
+
+    Each period covers the whole UTC days from its first file's first
+    timestamp to its last file's last timestamp. A day shared by both file
+    sets goes to Early; if that leaves Late empty (too few files), the
+    covered days are split in half instead.
+    """
+    ranges = log_store.file_time_ranges(files)
+
+    def covered_dates(period_files):
+        starts = [ranges[f][0] for f in period_files if ranges[f][0] is not None]
+        ends = [ranges[f][1] for f in period_files if ranges[f][1] is not None]
+        return (log_store.to_datetime(min(starts)).date(), log_store.to_datetime(max(ends)).date())
+
+    early_first, early_last = covered_dates(files[:num_files])
+    late_first, late_last = covered_dates(files[-num_files:])
+    late_first = max(late_first, early_last + timedelta(days=1))
+    if late_first > late_last:
+        early_last = early_first + timedelta(days=(late_last - early_first).days // 2)
+        late_first = early_last + timedelta(days=1)
+    return [("Early", early_first, early_last), ("Late", late_first, late_last)]
+
+
+class PeriodStats:
+    """Per-period accumulators filled by add_logs(), add_travel() and add_financial().
+
+    periods is a list of (name, first_date, last_date) with inclusive dates.
+    """
+
+    def __init__(self, periods):
+        self.names = [name for name, _, _ in periods]
+        self.dates = {name: (first, last) for name, first, last in periods}
+        bounds = [day_range(first, (last - first).days + 1) for _, first, last in periods]
+        self._starts = np.array([start for start, _ in bounds], dtype=np.int64)
+        self._ends = np.array([end for _, end in bounds], dtype=np.int64)
+        if np.any(np.diff(self._starts) <= 0) or np.any(self._starts[1:] < self._ends[:-1]):
+            raise ValueError("Periods must be in date order and must not overlap.")
+
+        n = len(periods)
+        self.log_rows = np.zeros(n, dtype=np.int64)
+        self.log_min = np.full(n, np.iinfo(np.int64).max)
+        self.log_max = np.full(n, np.iinfo(np.int64).min)
+        self.recreation_by_hour = np.zeros((n, 24), dtype=np.int64)
+        self.recreation_by_day = np.zeros((n, 7), dtype=np.int64)
+        self.work_rows = np.zeros(n, dtype=np.int64)
+        self._work_days = [np.empty(0, dtype=np.int64) for _ in range(n)]
+        self.commute_count = np.zeros(n, dtype=np.int64)
+        self.commute_minutes = np.zeros(n)
+        self.travel_count = np.zeros(n, dtype=np.int64)
+        self.travel_hours = np.zeros(n)
+        self.purpose_counts = [pd.Series(dtype=np.int64) for _ in range(n)]
+        self.spending = [pd.Series(dtype=np.float64) for _ in range(n)]
+
+    @property
+    def windows(self):
+        """[start, end) epoch bounds of every period."""
+        return [(int(start), int(end)) for start, end in zip(self._starts, self._ends)]
+
+    def period_of(self, epoch):
+        """Returns the period index of every epoch timestamp, -1 outside all periods."""
+        epoch = np.asarray(epoch)
+        index = np.searchsorted(self._starts, epoch, side="right") - 1
+        inside = (index >= 0) & (epoch < self._ends[np.maximum(index, 0)])
+        return np.where(inside, index, -1)
+
+    def add_logs(self, logs):
+        """Adds log rows with int64 epoch timestamps and a currentMode column."""
+        timestamps = logs["timestamp"].to_numpy()
+        period = self.period_of(timestamps)
+        keep = period >= 0
+        if not keep.any():
+            return
+        period, timestamps = period[keep], timestamps[keep]
+        modes = logs["currentMode"].to_numpy()[keep]
+        pids = logs["participantId"].to_numpy()[keep].astype(np.int64)
+        n = len(self.names)
+
+        self.log_rows += np.bincount(period, minlength=n)
+        np.minimum.at(self.log_min, period, timestamps)
+        np.maximum.at(self.log_max, period, timestamps)
+
+        days = timestamps // _NS_PER_DAY
+        day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday
+        hour = (timestamps % _NS_PER_DAY) // (3600 * _NS_PER_SECOND)
+
+        recreation = modes == "AtRecreation"
+        np.add.at(self.recreation_by_hour, (period[recreation], hour[recreation]), 1)
+        np.add.at(self.recreation_by_day, (period[recreation], day_of_week[recreation]), 1)
+
+        work = (modes == "AtWork") & (day_of_week < 5)
+        self.work_rows += np.bincount(period[work], minlength=n)
+        participant_days = (pids[work] << _DAY_BITS) | days[work]
+        for i in np.unique(period[work]):
+            self._work_days[i] = np.union1d(self._work_days[i], participant_days[period[work] == i])
+
+    def add_travel(self, travel):
+        """Adds TravelJournal rows, assigned to periods by travelStartTime."""
+        starts = log_store.to_epoch(travel["travelStartTime"])
+        ends = log_store.to_epoch(travel["travelEndTime"])
+        period = self.period_of(starts)
+        keep = period >= 0
+        period = period[keep]
+        minutes = (ends[keep] - starts[keep]) / (60 * _NS_PER_SECOND)
+        purposes = travel["purpose"].to_numpy()[keep]
+        n = len(self.names)
+
+        self.travel_count += np.bincount(period, minlength=n)
+        self.travel_hours += np.bincount(period, weights=minutes / 60, minlength=n)
+        commute = purposes == COMMUTE_PURPOSE
+        self.commute_count += np.bincount(period[commute], minlength=n)
+        self.commute_minutes += np.bincount(period[commute], weights=minutes[commute], minlength=n)
+        counts = pd.Series(purposes).groupby(period).value_counts()
+        for i in np.unique(period):
+            self.purpose_counts[i] = self.purpose_counts[i].add(counts.loc[i], fill_value=0)
+
+    def add_financial(self, financial):
+        """Adds FinancialJournal rows; negative amounts count as spending."""
+        period = self.period_of(log_store.to_epoch(financial["timestamp"]))
+        amounts = financial["amount"].to_numpy()
+        keep = (period >= 0) & (amounts < 0)
+        sums = pd.Series(-amounts[keep]).groupby(
+            [period[keep], financial["category"].to_numpy()[keep]]
+        ).sum()
+        for i in np.unique(period[keep]):
+            self.spending[i] = self.spending[i].add(sums.loc[i], fill_value=0)
+
+    def totals(self):
+        """Returns the additive accumulators as a frame indexed by period name.
+
+        Purpose counts and spending become "purpose:<name>" and
+        "spending:<category>" columns. Participant-days are not additive and
+        are returned by work_days().
+        """
+        frame = pd.DataFrame({
+            "log_rows": self.log_rows,
+            "recreation_rows": self.recreation_by_hour.sum(axis=1),
+            "work_rows": self.work_rows,
+            "commute_count": self.commute_count,
+            "commute_minutes": self.commute_minutes,
+            "travel_count": self.travel_count,
+            "travel_hours": self.travel_hours,
+        }, index=self.names)
+        purposes = pd.DataFrame([s.rename(None) for s in self.purpose_counts], index=self.names)
+        spending = pd.DataFrame([s.rename(None) for s in self.spending], index=self.names)
+        return pd.concat(
+            [frame, purposes.add_prefix("purpose:"), spending.add_prefix("spending:")], axis=1
+        ).fillna(0)
+
+    def work_days(self, name):
+        """Returns the participant-day keys with weekday AtWork rows in a period."""
+        return self._work_days[self.names.index(name)]
+
+    # --- Results, keyed by period name ---
+    def log_dates(self, name):
+        """Returns the (first, last) dates with log rows in a period, or None."""
+        i = self.names.index(name)
+        if self.log_rows[i] == 0:
+            return None
+        return (
+            log_store.to_datetime(self.log_min[i]).date(),
+            log_store.to_datetime(self.log_max[i]).date(),
+        )
+
+    def num_days(self, name):
+        first, last = self.dates[name]
+        return (last - first).days + 1
+
+    def recreation_distribution(self, name):
+        """Returns (share by hour, share by day name) of AtRecreation rows."""
+        i = self.names.index(name)
+        by_hour = pd.Series(self.recreation_by_hour[i], index=range(24))
+        by_day = pd.Series(self.recreation_by_day[i], index=DAY_NAMES)
+        total = by_hour.sum()
+        if total == 0:
+            return pd.Series(dtype=float), pd.Series(dtype=float)
+        return by_hour[by_hour > 0] / total, by_day / total
+
+    def recreation_rows(self, name):
+        return int(self.recreation_by_hour[self.names.index(name)].sum())
+
+    def work_hours_per_day(self, name):
+        """Returns (average weekday hours AtWork per participant-day, participant-days)."""
+        i = self.names.index(name)
+        work_days = len(self._work_days[i])
+        if work_days == 0:
+            return np.nan, 0
+        return self.work_rows[i] * LOG_INTERVAL_MINUTES / work_days / 60, work_days
+
+    def average_commute_minutes(self, name):
+        i = self.names.index(name)
+        count = self.commute_count[i]
+        return (self.commute_minutes[i] / count if count else np.nan), int(count)
+
+    def total_travel_hours(self, name):
+        i = self.names.index(name)
+        return self.travel_hours[i], int(self.travel_count[i])
+
+    def purpose_distribution(self, name, exclude=None):
+        counts = self.purpose_counts[self.names.index(name)]
+        if exclude is not None:
+            counts = counts.drop(exclude, errors="ignore")
+        if counts.sum() == 0:
+            return pd.Series(dtype=float)
+        return (counts / counts.sum()).sort_values(ascending=False, kind="stable")
+
+    def average_daily_spending(self, name, categories):
+        spending = self.spending[self.names.index(name)]
+        return (spending / self.num_days(name)).reindex(categories).fillna(0)
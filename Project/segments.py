@@ -0,0 +1,156 @@
+"""Run-length mode segments of the activity logs.
+
+A segment is a run of consecutive log rows of one participant with the same
+currentMode within one UTC day. All segments of all participants are found
+at once from change points in (participantId, mode code, day), giving a
+compact table of (participantId, currentMode, start, end, rows) with int64
+epoch start/end.
+
+Segments are cached per log file under SEGMENTS_DIR, so newly arrived log
+files only add their own tables; stitch_segments() joins runs that a file
+boundary split in two when the tables of several files are combined.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import log_store
+
+# --- Configuration ---
+SEGMENTS_DIR = f"{log_store.DATA_DIR}/Cache/Segments"
+SEGMENTS_MANIFEST_FILE = f"{SEGMENTS_DIR}/manifest.json"
+SEGMENT_COLUMNS = ["participantId", "currentMode", "start", "end", "rows"]
+
+_NS_PER_DAY = 86400 * 1_000_000_000
+# The last log row of a day covers the rest of its 5-minute step
+LAST_ROW_DURATION = pd.Timedelta(minutes=4, seconds=59).value
+# Segments are capped at 23:59:59.999999 of their day
+DAY_END_OFFSET = _NS_PER_DAY - 1000
+
+
+def extract_segments(logs):
+    """Returns the mode segments of logs (participantId, timestamp, currentMode).
+
+    A segment ends where the next one of the same participant and day starts;
+    the last segment of a day ends LAST_ROW_DURATION after its last row,
+    capped at the end of the day.
+    """
+    if logs.empty:
+        return pd.DataFrame({
+            "participantId": np.empty(0, dtype=np.int32),
+            "currentMode": pd.Categorical([], categories=log_store.LOG_MODES),
+            "start": np.empty(0, dtype=np.int64),
+            "end": np.empty(0, dtype=np.int64),
+            "rows": np.empty(0, dtype=np.int32),
+        })
+    pids = logs["participantId"].to_numpy()
+    timestamps = logs["timestamp"].to_numpy()
+    order = np.lexsort((timestamps, pids))
+    pids, timestamps = pids[order], timestamps[order]
+    modes = logs["currentMode"].astype("category").array[order]
+    codes = modes.codes
+    days = timestamps // _NS_PER_DAY
+
+    change = np.ones(len(pids), dtype=bool)
+    change[1:] = (pids[1:] != pids[:-1]) | (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])
+    first_rows = np.flatnonzero(change)
+    next_rows = np.append(first_rows[1:], len(pids))
+
+    has_next = next_rows < len(pids)
+    next_index = np.minimum(next_rows, len(pids) - 1)
+    continues = has_next & (pids[next_index] == pids[first_rows]) & (days[next_index] == days[first_rows])
+    last_row_end = np.minimum(
+        timestamps[next_rows - 1] + LAST_ROW_DURATION, days[first_rows] * _NS_PER_DAY + DAY_END_OFFSET
+    )
+    return pd.DataFrame({
+        "participantId": pids[first_rows].astype(np.int32),
+        "currentMode": modes[first_rows],
+        "start": timestamps[first_rows],
+        "end": np.where(continues, timestamps[next_index], last_row_end),
+        "rows": (next_rows - first_rows).astype(np.int32),
+    })
+
+
+def stitch_segments(segments):
+    """Joins segment tables of consecutive log files into one table.
+
+    Within one file, consecutive segments of a participant and day already
+    end where the next starts and never share a mode. Across a file boundary
+    the last segment of a day ends early, and may continue in the next file
+    with the same mode; both are fixed here.
+    """
+    if segments.empty:
+        return segments
+    order = np.lexsort((segments["start"].to_numpy(), segments["participantId"].to_numpy()))
+    segments = segments.iloc[order].reset_index(drop=True)
+    pids = segments["participantId"].to_numpy()
+    starts = segments["start"].to_numpy()
+    ends = segments["end"].to_numpy().copy()
+    codes = segments["currentMode"].array.codes
+    days = starts // _NS_PER_DAY
+
+    same_day = (pids[1:] == pids[:-1]) & (days[1:] == days[:-1])
+    ends[:-1][same_day] = starts[1:][same_day]
+    continued = np.zeros(len(segments), dtype=bool)
+    continued[1:] = same_day & (codes[1:] == codes[:-1])
+    first_rows = np.flatnonzero(~continued)
+    last_rows = np.append(first_rows[1:], len(segments)) - 1
+    return pd.DataFrame({
+        "participantId": pids[first_rows],
+        "currentMode": segments["currentMode"].array[first_rows],
+        "start": starts[first_rows],
+        "end": ends[last_rows],
+        "rows": np.add.reduceat(segments["rows"].to_numpy(), first_rows).astype(np.int32),
+    })
+
+
+def _segments_path(file_path):
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return f"{SEGMENTS_DIR}/{name}.feather"
+
+
+def _build_file_segments(file_path):
+    logs = log_store.load_log_file(file_path, columns=["participantId", "timestamp", "currentMode"])
+    segments = extract_segments(logs)
+    log_store.replace_atomically(
+        _segments_path(file_path), lambda tmp_file: segments.to_feather(tmp_file, compression="uncompressed")
+    )
+    return len(logs), len(segments)
+
+
+def load_segments(files, workers=log_store.INGEST_WORKERS):
+    """Returns the stitched segment table of the given log files.
+
+    Only files without an up-to-date per-file table are read, across the
+    log_store process pool.
+    """
+    log_store.ensure_cached(files, workers)
+    sources = log_store.source_signatures(files)
+    manifest = {}
+    if os.path.exists(SEGMENTS_MANIFEST_FILE):
+        with open(SEGMENTS_MANIFEST_FILE) as f:
+            manifest = json.load(f)
+    stale_files = [
+        f for f in files
+        if manifest.get(os.path.basename(f)) != sources[os.path.basename(f)]
+        or not os.path.exists(_segments_path(f))
+    ]
+    if stale_files:
+        os.makedirs(SEGMENTS_DIR, exist_ok=True)
+        counts = log_store.map_files(_build_file_segments, stale_files, workers)
+        print(
+            f"  Extracted {sum(n for _, n in counts)} mode segments from {sum(n for n, _ in counts)} "
+            f"log rows of {len(stale_files)} new or changed files."
+        )
+        for file_path in stale_files:
+            manifest[os.path.basename(file_path)] = sources[os.path.basename(file_path)]
+        log_store.write_json(SEGMENTS_MANIFEST_FILE, manifest)
+    tables = [log_store.read_mapped(_segments_path(f)) for f in files]
+    tables = [table for table in tables if not table.empty]
+    if not tables:
+        return extract_segments(pd.DataFrame())
+    if len(tables) == 1:
+        return tables[0]
+    return stitch_segments(log_store.concat_logs(tables))
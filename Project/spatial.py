@@ -0,0 +1,84 @@
+"""KD-tree nearest-amenity queries over parsed point arrays.
+
+Amenity locations (pubs, restaurants, employers, schools) are indexed once
+with scipy's cKDTree; whole batches of query points such as apartments or
+transport log positions then get their k nearest amenities, or every amenity
+within a radius, in one vectorized call instead of a points x amenities loop.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+import wkt
+
+
+class AmenityIndex:
+    """KD-tree over one set of (n, 2) amenity locations."""
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self._tree = cKDTree(self.points) if len(self.points) else None
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, query, k=1):
+        """Returns (distances, rows) of the k nearest amenities for every query point.
+
+        Both arrays have shape (n,) for k=1 and (n, k) otherwise. Missing
+        neighbours (fewer than k amenities) get distance inf and row -1.
+        """
+        query = np.asarray(query, dtype=np.float64).reshape(-1, 2)
+        shape = (len(query),) if k == 1 else (len(query), k)
+        if self._tree is None:
+            return np.full(shape, np.inf), np.full(shape, -1, dtype=np.int64)
+        distances, rows = self._tree.query(query, k=k)
+        rows = np.where(rows < len(self.points), rows, -1).astype(np.int64)
+        return distances, rows
+
+    def within(self, query, radius):
+        """Returns (counts, offsets, amenity_rows) of the amenities within radius of every query point.
+
+        The result is CSR-style: the amenities of query point i are
+        amenity_rows[offsets[i]:offsets[i + 1]] (counts[i] of them, in row
+        order). All pairs come from one sparse distance query between two trees.
+        """
+        query = np.asarray(query, dtype=np.float64).reshape(-1, 2)
+        offsets = np.zeros(len(query) + 1, dtype=np.int64)
+        if self._tree is None or not len(query):
+            return np.zeros(len(query), dtype=np.int64), offsets, np.empty(0, dtype=np.int64)
+        pairs = self._tree.sparse_distance_matrix(cKDTree(query), radius, output_type="ndarray")
+        order = np.lexsort((pairs["i"], pairs["j"]))
+        query_rows = pairs["j"][order].astype(np.int64)
+        counts = np.bincount(query_rows, minlength=len(query))
+        np.cumsum(counts, out=offsets[1:])
+        return counts, offsets, pairs["i"][order].astype(np.int64)
+
+    def count_within(self, query, radius):
+        """Returns the number of amenities within radius of every query point."""
+        query = np.asarray(query, dtype=np.float64).reshape(-1, 2)
+        if self._tree is None:
+            return np.zeros(len(query), dtype=np.int64)
+        return np.asarray(self._tree.query_ball_point(query, radius, return_length=True))
+
+
+def load_amenity_index(csv_path):
+    """Returns an AmenityIndex over the WKT points in the location column of csv_path."""
+    locations = pd.read_csv(csv_path, usecols=["location"])["location"]
+    coords, bad_rows = wkt.parse_points(locations)
+    wkt.report_bad_rows(csv_path, locations, bad_rows)
+    return AmenityIndex(np.delete(coords, bad_rows, axis=0))
+
+
+def nearest_amenities(query, indexes):
+    """Returns a frame with the nearest distance and row per amenity type.
+
+    indexes maps a name (e.g. "pub") to its AmenityIndex; the frame has one
+    row per query point and columns "<name>_distance" and "<name>_row".
+    """
+    columns = {}
+    for name, index in indexes.items():
+        distances, rows = index.nearest(query)
+        columns[f"{name}_distance"] = distances
+        columns[f"{name}_row"] = rows
+    return pd.DataFrame(columns)
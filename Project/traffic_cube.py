@@ -0,0 +1,163 @@
+"""Day x 3-hour-interval traffic density cube for the Question2.2 heatmaps.
+
+Transport points are binned once into a dense count array of shape
+(day, interval, ny, nx). The cube can be saved next to the log cache and
+rendered as go.Heatmap z-matrices, so the figure size no longer depends on
+the number of log points. accumulate_log_csv() folds raw CSV chunks straight
+into a cube with fixed bin edges, so memory stays bounded by the chunk size;
+stream_log_files() does that for many files across a process pool. Counts
+are additive, so a saved cube is extended with newly arrived log files
+instead of being rebuilt (load_cube() reports which sources are new).
+"""
+import functools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import log_store
+import wkt
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+INTERVAL_HOURS = 3
+INTERVALS = list(range(0, 24, INTERVAL_HOURS))
+N_BINS = 100
+
+_NS_PER_SECOND = 1_000_000_000
+
+
+def day_interval_codes(epoch):
+    """Returns (day of week, 3-hour interval) indices for UTC epoch nanoseconds."""
+    seconds = np.asarray(epoch) // _NS_PER_SECOND
+    # 1970-01-01 was a Thursday (index 3 with Monday = 0)
+    day_of_week = (seconds // 86400 + 3) % 7
+    hour = (seconds % 86400) // 3600
+    return day_of_week, hour // INTERVAL_HOURS
+
+
+def make_edges(x_min, x_max, y_min, y_max, n_bins=N_BINS):
+    """Returns n_bins equal-width bin edges along x and y."""
+    if not x_max > x_min:
+        x_max = x_min + 1
+    if not y_max > y_min:
+        y_max = y_min + 1
+    return np.linspace(x_min, x_max, n_bins + 1), np.linspace(y_min, y_max, n_bins + 1)
+
+
+def empty_cube(x_edges, y_edges):
+    return np.zeros((len(DAY_NAMES), len(INTERVALS), len(y_edges) - 1, len(x_edges) - 1), dtype=np.int64)
+
+
+def _bin_index(values, edges):
+    index = np.searchsorted(edges, values, side="right") - 1
+    # The last edge is inclusive, as in np.histogram
+    index[values == edges[-1]] = len(edges) - 2
+    return index
+
+
+def accumulate(cube, x_edges, y_edges, x, y, epoch):
+    """Adds points to cube in place with one bincount, returns how many were binned."""
+    day, interval = day_interval_codes(epoch)
+    xi = _bin_index(np.asarray(x), x_edges)
+    yi = _bin_index(np.asarray(y), y_edges)
+    n_days, n_intervals, ny, nx = cube.shape
+    inside = (xi >= 0) & (xi < nx) & (yi >= 0) & (yi < ny)
+    keys = ((day * n_intervals + interval) * ny + yi) * nx + xi
+    cube += np.bincount(keys[inside], minlength=cube.size).reshape(cube.shape)
+    return int(inside.sum())
+
+
+def accumulate_log_csv(cube, x_edges, y_edges, file_path, chunk_size):
+    """Streams one raw log CSV into cube chunk by chunk without keeping the points.
+
+    Returns (transport points seen, transport points binned). Rows whose
+    location is not a valid WKT point are reported and not counted as seen.
+    """
+    n_points = n_binned = 0
+    chunks = pd.read_csv(
+        file_path, usecols=["timestamp", "currentLocation", "currentMode"], chunksize=chunk_size
+    )
+    for chunk in chunks:
+        chunk = chunk[chunk["currentMode"] == "Transport"]
+        if chunk.empty:
+            continue
+        coords, bad_rows = wkt.parse_points(chunk["currentLocation"])
+        wkt.report_bad_rows(file_path, chunk["currentLocation"], bad_rows)
+        n_points += len(chunk) - len(bad_rows)
+        n_binned += accumulate(
+            cube, x_edges, y_edges, coords[:, 0], coords[:, 1], log_store.to_epoch(chunk["timestamp"])
+        )
+    return n_points, n_binned
+
+
+def _stream_log_file(file_path, x_edges, y_edges, chunk_size):
+    cube = empty_cube(x_edges, y_edges)
+    try:
+        n_points, n_binned = accumulate_log_csv(cube, x_edges, y_edges, file_path, chunk_size)
+    except pd.errors.EmptyDataError:
+        n_points = n_binned = 0
+    except Exception as e:
+        print(f"Error processing log file {file_path}: {e}")
+        n_points = n_binned = 0
+    return cube, n_points, n_binned
+
+
+def stream_log_files(files, x_edges, y_edges, chunk_size, workers=log_store.INGEST_WORKERS):
+    """Streams log CSVs into one cube, one file per worker process.
+
+    Each worker returns a partial cube for its file, which is summed here.
+    Returns (cube, transport points seen, transport points binned).
+    """
+    stream_file = functools.partial(
+        _stream_log_file, x_edges=x_edges, y_edges=y_edges, chunk_size=chunk_size
+    )
+    cube = empty_cube(x_edges, y_edges)
+    total_points = total_binned = 0
+    for partial_cube, n_points, n_binned in log_store.map_files(stream_file, files, workers):
+        cube += partial_cube
+        total_points += n_points
+        total_binned += n_binned
+    return cube, total_points, total_binned
+
+
+def build_cube(x, y, epoch, n_bins=N_BINS):
+    """Bins points over their own extent, returns (cube, x_edges, y_edges)."""
+    x, y = np.asarray(x), np.asarray(y)
+    if len(x):
+        x_edges, y_edges = make_edges(np.min(x), np.max(x), np.min(y), np.max(y), n_bins)
+    else:
+        x_edges, y_edges = make_edges(0, 1, 0, 1, n_bins)
+    cube = empty_cube(x_edges, y_edges)
+    accumulate(cube, x_edges, y_edges, x, y, epoch)
+    return cube, x_edges, y_edges
+
+
+def bin_centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
+
+
+def save_cube(file_path, cube, x_edges, y_edges, sources):
+    """Writes the cube with the source signature it was built from."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    np.savez_compressed(
+        file_path, cube=cube, x_edges=x_edges, y_edges=y_edges,
+        sources=np.array(json.dumps(sources, sort_keys=True)),
+    )
+
+
+def load_cube(file_path, sources):
+    """Returns (cube, x_edges, y_edges, new_sources) of a saved cube built from part of sources.
+
+    new_sources lists the keys of sources the cube does not contain yet, so
+    only those files have to be added. Returns None if there is no saved cube
+    or any entry it was built from differs from sources or is missing.
+    """
+    if not os.path.exists(file_path):
+        return None
+    with np.load(file_path) as saved:
+        saved_sources = json.loads(str(saved["sources"]))
+        if any(sources.get(name) != value for name, value in saved_sources.items()):
+            return None
+        new_sources = [name for name in sources if name not in saved_sources]
+        return saved["cube"], saved["x_edges"], saved["y_edges"], new_sources
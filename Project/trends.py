@@ -0,0 +1,173 @@
+"""Incremental weekly/monthly trend accumulators for the Question4 hypotheses.
+
+Every log file and journal chunk is aggregated into calendar buckets (weeks
+starting on Monday, or months) with period_stats.PeriodStats, and the
+additive bucket totals are kept in a state file under the cache directory.
+A re-run only reads log files that were not processed yet and the journal
+rows appended since the last run; if a processed file changed or vanished,
+the state is rebuilt from scratch. Journals are only treated as appended
+while the sha256 of their already consumed prefix is unchanged.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import log_store
+from period_stats import LOG_INTERVAL_MINUTES, PeriodStats
+
+FREQUENCIES = {"W": "W-SUN", "M": "M"}  # Weeks run Monday to Sunday
+STATE_FILE = f"{log_store.DATA_DIR}/Cache/trends_{{frequency}}.pkl"
+JOURNAL_CHUNK_SIZE = 1_000_000
+
+
+def bucket_periods(start, end, frequency):
+    """Returns (label, first_date, last_date) buckets covering epoch [start, end]."""
+    first = log_store.to_datetime(start).tz_localize(None)
+    last = log_store.to_datetime(end).tz_localize(None)
+    return [
+        (str(period.start_time.date()), period.start_time.date(), period.end_time.date())
+        for period in pd.period_range(first, last, freq=FREQUENCIES[frequency])
+    ]
+
+
+def _empty_state():
+    return {
+        "files": {},
+        "journals": {},
+        "totals": pd.DataFrame(dtype=np.float64),
+        "work_days": {},
+        "bucket_dates": {},
+        "log_dates": {},
+    }
+
+
+class TrendStore:
+    """Persistent per-bucket totals for one frequency ("W" or "M")."""
+
+    def __init__(self, frequency):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown trend frequency {frequency!r}, expected one of {list(FREQUENCIES)}.")
+        self.frequency = frequency
+        self.state_file = STATE_FILE.format(frequency=frequency)
+        self.state = pd.read_pickle(self.state_file) if os.path.exists(self.state_file) else _empty_state()
+
+    def _fold(self, stats):
+        self.state["totals"] = self.state["totals"].add(stats.totals(), fill_value=0)
+        for name in stats.names:
+            self.state["bucket_dates"][name] = stats.dates[name]
+            log_dates = stats.log_dates(name)
+            if log_dates is not None:
+                first, last = self.state["log_dates"].get(name, log_dates)
+                self.state["log_dates"][name] = (min(first, log_dates[0]), max(last, log_dates[1]))
+            self.state["work_days"][name] = np.union1d(
+                self.state["work_days"].get(name, np.empty(0, dtype=np.int64)), stats.work_days(name)
+            )
+
+    def _is_stale(self, log_files, journal_files):
+        signatures = log_store.source_signatures(log_files)
+        for name, signature in self.state["files"].items():
+            if signatures.get(name) != signature:
+                return True
+        for file_path, seen in self.state["journals"].items():
+            if not os.path.exists(file_path) or os.path.getsize(file_path) < seen["size"]:
+                return True
+            # Appending keeps the consumed prefix; any rewrite of it changes its hash
+            if os.path.getmtime(file_path) != seen.get("mtime") and (
+                log_store.file_hash(file_path, seen["size"]) != seen.get("sha256")
+            ):
+                return True
+        return False
+
+    def _update_journal(self, file_path, columns, add):
+        """Reads only the journal rows appended since the last run; columns[0] is the time column."""
+        seen = self.state["journals"].get(file_path, {"rows": 0, "size": 0})
+        size = os.path.getsize(file_path)
+        if size == seen["size"]:
+            return 0
+        rows = 0
+        chunks = pd.read_csv(file_path, usecols=columns, skiprows=range(1, seen["rows"] + 1),
+                             chunksize=JOURNAL_CHUNK_SIZE)
+        for chunk in chunks:
+            rows += len(chunk)
+            epoch = log_store.to_epoch(chunk[columns[0]])
+            stats = PeriodStats(bucket_periods(epoch.min(), epoch.max(), self.frequency))
+            add(stats, chunk)
+            self._fold(stats)
+        self.state["journals"][file_path] = {
+            "rows": seen["rows"] + rows,
+            "size": size,
+            "mtime": os.path.getmtime(file_path),
+            "sha256": log_store.file_hash(file_path, size),
+        }
+        return rows
+
+    def update(self, log_files, travel_file, financial_file):
+        """Folds in unprocessed log files and new journal rows, then saves the state."""
+        journal_files = [f for f in (travel_file, financial_file) if os.path.exists(f)]
+        log_store.ensure_cached(log_files)
+        if self._is_stale(log_files, journal_files):
+            print("  Processed inputs changed, rebuilding trend state...")
+            self.state = _empty_state()
+
+        signatures = log_store.source_signatures(log_files)
+        new_files = [f for f in log_files if os.path.basename(f) not in self.state["files"]]
+        print(f"  {len(new_files)} new log files ({len(log_files) - len(new_files)} already aggregated).")
+        for file_path in new_files:
+            logs = log_store.load_log_file(file_path, columns=["participantId", "timestamp", "currentMode"])
+            if not logs.empty:
+                timestamps = logs["timestamp"].to_numpy()
+                stats = PeriodStats(bucket_periods(timestamps.min(), timestamps.max(), self.frequency))
+                stats.add_logs(logs)
+                self._fold(stats)
+            self.state["files"][os.path.basename(file_path)] = signatures[os.path.basename(file_path)]
+
+        if travel_file in journal_files:
+            rows = self._update_journal(
+                travel_file, ["travelStartTime", "travelEndTime", "purpose"], PeriodStats.add_travel
+            )
+            print(f"  {rows} new travel journal rows.")
+        if financial_file in journal_files:
+            rows = self._update_journal(
+                financial_file, ["timestamp", "category", "amount"], PeriodStats.add_financial
+            )
+            print(f"  {rows} new financial journal rows.")
+
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        pd.to_pickle(self.state, self.state_file)
+
+    def metrics(self, spending_categories, exclude_purpose=None):
+        """Returns (metric series, purpose shares), both indexed by bucket start date.
+
+        Per-day rates divide by the days of the bucket covered by log rows, so
+        partial first and last buckets are not diluted.
+        """
+        totals = self.state["totals"].sort_index()
+        if totals.empty:
+            return pd.DataFrame(), pd.DataFrame()
+        dates = {**self.state["bucket_dates"], **self.state["log_dates"]}
+        days = pd.Series({
+            name: (last - first).days + 1 for name, (first, last) in dates.items()
+        }).reindex(totals.index)
+        work_days = pd.Series({
+            name: len(keys) for name, keys in self.state["work_days"].items()
+        }).reindex(totals.index).fillna(0)
+
+        metrics = pd.DataFrame({
+            "Recreation share of log rows": totals["recreation_rows"] / totals["log_rows"].replace(0, np.nan),
+            "Weekday hours AtWork per participant-day": (
+                totals["work_rows"] * LOG_INTERVAL_MINUTES / 60 / work_days.replace(0, np.nan)
+            ),
+            "Avg commute (min)": totals["commute_minutes"] / totals["commute_count"].replace(0, np.nan),
+            "Travel hours per day": totals["travel_hours"] / days,
+        })
+        for category in spending_categories:
+            column = f"spending:{category}"
+            spending = totals[column] if column in totals else 0
+            metrics[f"{category} spending per day"] = spending / days
+
+        purposes = totals.filter(like="purpose:").rename(columns=lambda c: c[len("purpose:"):])
+        if exclude_purpose is not None:
+            purposes = purposes.drop(columns=exclude_purpose, errors="ignore")
+        purpose_shares = purposes.div(purposes.sum(axis=1).replace(0, np.nan), axis=0)
+        return metrics, purpose_shares
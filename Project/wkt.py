@@ -0,0 +1,112 @@
+"""Vectorized parsers for columns of WKT POINT and POLYGON strings.
+
+A whole column is joined into one string and split once, so the per-row
+Python work of the old replace/split loops disappears. Rows that are not
+valid geometries are returned as bad_rows (positional indices) instead of
+being skipped silently.
+"""
+import numpy as np
+import pandas as pd
+
+_ROW_SEP = "|"
+_HOLE_SEP = "~"
+
+
+def _tokenize(values, replacements):
+    """Splits a column into tokens, returns (tokens, row index of each token)."""
+    strings = pd.Series(values, copy=False).fillna("").astype(str).tolist()
+    text = f" {_ROW_SEP} ".join(strings) + f" {_ROW_SEP}"
+    for old, new in replacements:
+        text = text.replace(old, new)
+    tokens = np.array(text.split(), dtype=object)
+    is_sep = tokens == _ROW_SEP
+    token_rows = np.cumsum(is_sep) - is_sep
+    return tokens[~is_sep], token_rows[~is_sep]
+
+
+def _to_float(tokens, token_rows, n_rows):
+    """Converts tokens to float64, flags rows containing unparsable tokens."""
+    try:
+        numbers = np.array(tokens.tolist(), dtype=np.float64)
+    except ValueError:
+        numbers = pd.to_numeric(pd.Series(tokens, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    has_nan = np.bincount(token_rows[np.isnan(numbers)], minlength=n_rows) > 0
+    return numbers, has_nan
+
+
+def parse_points(values):
+    """Parses WKT POINT strings into an (n, 2) float64 coordinate array.
+
+    Returns (coords, bad_rows). Rows that are not a valid POINT are NaN in
+    coords and their positions are listed in bad_rows.
+    """
+    n_rows = len(values)
+    coords = np.full((n_rows, 2), np.nan)
+    if n_rows == 0:
+        return coords, np.empty(0, dtype=np.intp)
+    tokens, token_rows = _tokenize(values, [("POINT (", " "), (")", " ")])
+    numbers, has_nan = _to_float(tokens, token_rows, n_rows)
+    bad = has_nan | (np.bincount(token_rows, minlength=n_rows) != 2)
+    good_tokens = ~bad[token_rows]
+    coords[~bad] = numbers[good_tokens].reshape(-1, 2)
+    return coords, np.flatnonzero(bad)
+
+
+def parse_polygons(values):
+    """Parses WKT POLYGON strings into CSR-style coordinate arrays.
+
+    Returns (coords, offsets, bad_rows): the vertices of row i are
+    coords[offsets[i]:offsets[i + 1]]. Only the exterior ring is kept.
+    Rows that are not a valid polygon with at least three vertices get no
+    vertices and are listed in bad_rows.
+    """
+    n_rows = len(values)
+    if n_rows == 0:
+        return np.empty((0, 2)), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.intp)
+    tokens, token_rows = _tokenize(values, [
+        ("POLYGON ((", " "), ("), (", f" {_HOLE_SEP} "), ("))", " "), (",", " "),
+    ])
+    # Drop interior rings: every token after a hole marker in the same row
+    is_hole_sep = tokens == _HOLE_SEP
+    holes_seen = np.cumsum(is_hole_sep)
+    row_starts = np.searchsorted(token_rows, np.arange(n_rows))
+    holes_before_row = np.concatenate([[0], holes_seen])[row_starts]
+    exterior = (holes_seen - holes_before_row[token_rows]) == 0
+    tokens, token_rows = tokens[exterior], token_rows[exterior]
+
+    numbers, has_nan = _to_float(tokens, token_rows, n_rows)
+    token_counts = np.bincount(token_rows, minlength=n_rows)
+    bad = has_nan | (token_counts % 2 != 0) | (token_counts < 6)
+    coords = numbers[~bad[token_rows]].reshape(-1, 2)
+    offsets = np.concatenate([[0], np.cumsum(np.where(bad, 0, token_counts // 2))])
+    return coords, offsets, np.flatnonzero(bad)
+
+
+def join_rings(coords, offsets, rows):
+    """Concatenates the rings of the given polygon rows, separated by NaN.
+
+    Returns (x, y) for a single Plotly trace: with fill="toself" every
+    NaN-separated ring is drawn as its own filled polygon.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    # Each ring takes its vertices plus one NaN separator in the output
+    out_starts = np.cumsum(lengths + 1) - (lengths + 1)
+    n_vertices = int(lengths.sum())
+    within_ring = np.arange(n_vertices) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    source = np.repeat(starts, lengths) + within_ring
+    target = np.repeat(out_starts, lengths) + within_ring
+    joined = np.full((n_vertices + len(rows), 2), np.nan)
+    joined[target] = coords[source]
+    return joined[:, 0], joined[:, 1]
+
+
+def report_bad_rows(label, values, bad_rows, limit=3):
+    """Prints a short summary of rows that failed to parse."""
+    if len(bad_rows) == 0:
+        return
+    examples = [str(values.iloc[i]) if hasattr(values, "iloc") else str(values[i])
+                for i in bad_rows[:limit]]
+    print(f"Warning: {len(bad_rows)} unparsable locations in {label} "
+          f"(rows {bad_rows[:limit].tolist()}, e.g. {examples})")
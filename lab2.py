@@ -1,8 +1,16 @@
+import functools
+import glob
+import importlib.util
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 import plotly.express as px
 import plotly.graph_objects as go
-import sys  
+
+import transitions
 
 
 FILE_PATH = 'data.tsv'
@@ -19,211 +27,449 @@ COLUMN_NAMES = [
 X_COL = 'GazePointX(px)'
 Y_COL = 'GazePointY(px)'
 
-data = pd.read_csv(FILE_PATH, sep='\s+', header=0, names=COLUMN_NAMES)
-print(f"Data loaded successfully from '{FILE_PATH}'.")
-print(f"Shape: {data.shape}")
-print("First 5 rows:")
-print(data.head())
-print("-" * 30)
-
-if X_COL not in data.columns or Y_COL not in data.columns:
-    print(
-        f"Error: Required columns '{X_COL}' or '{Y_COL}' not found in the data."
-    )
-    print(f"Available columns: {list(data.columns)}")
-    sys.exit(1)
-
-print(X_COL)
-print(Y_COL)
-
-coordinates = data[[X_COL, Y_COL]].values
-
 N_CLUSTERS = 3
 RANDOM_STATE = 10
 
-
-fig = px.scatter(
-    data,
-    x=X_COL,
-    y=Y_COL,
-    title='Gaze Data',
-    labels={X_COL: 'X Coordinate', Y_COL: 'Y Coordinate'},
-)
-fig.show()
-
-
-kmeans = KMeans(
-    n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, n_init=10
-)  
-
-data['Cluster'] = kmeans.fit_predict(coordinates)
-
-
-fig = px.scatter(
-    data,
-    x=X_COL,
-    y=Y_COL,
-    color='Cluster',
-    title='K-Means ',
-    labels={X_COL: 'X Coordinate', Y_COL: 'Y Coordinate', 'Cluster': 'Cluster'},
-)
-
-
-fig.add_trace(
-    go.Scatter(
-        x=kmeans.cluster_centers_[:, 0],
-        y=kmeans.cluster_centers_[:, 1],
-        mode='markers',
-        marker=dict(size=12, color='black', symbol='x'),
-        name='Centroids',
+# Streaming mode: read FILE_PATH twice in CHUNK_SIZE-row chunks. The first
+# pass updates MiniBatchKMeans centroids with BATCH_SIZE-point minibatches,
+# the second labels every chunk with the final centroids and keeps only the
+# timestamp, int8 cluster and float32 coordinates of each point. Full-batch
+# KMeans on the whole recording is used otherwise.
+STREAM_CLUSTERING = False
+CHUNK_SIZE = 100_000
+BATCH_SIZE = 4096
+
+USAGE_INTERVAL = '1s'  # Time bins of the cluster usage plot
+TRANSITION_WINDOW = '10s'  # Time windows of the space-time cube
+TRANSITION_LAGS = [1, 5]  # Sample lags of the lagged transition counts
+KGRAM_ORDER = 3  # Length of the region sequences counted between distinct clusters
+
+# Gaze scatter rendering: 'points' plots every sample, 'raster' bins them
+# into a RASTER_BINS x RASTER_BINS density heatmap (one per cluster), and
+# 'sample' plots a random subset of at most RENDER_MAX_POINTS samples.
+# 'auto' rasterizes recordings with more than RENDER_MAX_POINTS samples.
+GAZE_RENDERING = 'auto'
+GAZE_RENDERINGS = ['auto', 'points', 'raster', 'sample']
+RENDER_MAX_POINTS = 200_000
+RASTER_BINS = 200
+
+# Batch mode: analyze every BATCH_PATTERN recording in BATCH_INPUT_DIR, one
+# per worker process, and write the result arrays (and optionally static
+# figures) to BATCH_OUTPUT_DIR instead of showing the plots.
+BATCH_INPUT_DIR = None
+BATCH_PATTERN = '*.tsv'
+BATCH_OUTPUT_DIR = 'results'
+BATCH_WORKERS = os.cpu_count() or 1
+WRITE_FIGURES = False
+FIGURE_FORMAT = 'png'  # 'html', or an image format, which needs the kaleido package
+
+
+def load_gaze(file_path, verbose=True):
+    """Reads a whole gaze recording."""
+    data = pd.read_csv(file_path, sep=r'\s+', header=0, names=COLUMN_NAMES)
+    if verbose:
+        print(f"Data loaded successfully from '{file_path}'.")
+        print(f"Shape: {data.shape}")
+        print("First 5 rows:")
+        print(data.head())
+        print("-" * 30)
+
+    if X_COL not in data.columns or Y_COL not in data.columns:
+        raise ValueError(
+            f"Required columns '{X_COL}' or '{Y_COL}' not found in the data. "
+            f"Available columns: {list(data.columns)}"
+        )
+    return data
+
+
+def cluster_gaze(data):
+    """Sets data['Cluster'] with full-batch KMeans and returns the fitted model."""
+    kmeans = KMeans(
+        n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, n_init=10
     )
-)
-
-fig.show()
-
-
-
-data['Time'] = pd.to_datetime(
-    data['RecordingTimestamp'], unit='ms'
-) 
-
-
-time_interval = 'x  '  
-data['TimeInterval'] = data['Time'].dt.floor(time_interval)
-
-
-cluster_usage = (
-    data.groupby(['TimeInterval', 'Cluster'])
-    .size()
-    .unstack(fill_value=0)
-)  
-
-print( data.groupby(['TimeInterval', 'Cluster'])
-    .size()
-    .unstack(fill_value=0))
-
-
-cluster_totals = data['Cluster'].value_counts().sort_values(ascending=False)
-print("\nHeavily Used Regions (Overall):")
-print(cluster_totals)
-
-
-cluster_usage_df = cluster_usage.reset_index()  
-cluster_usage_melted = cluster_usage_df.melt(
-    id_vars='TimeInterval',
-    var_name='Cluster',
-    value_name='FixationCount',
-)  
-
-fig = px.line(
-    cluster_usage_melted,
-    x='TimeInterval',
-    y='FixationCount',
-    color='Cluster',
-    title='Cluster Usage',
-    labels={'TimeInterval': 'Time', 'FixationCount': 'Number of points'},
-)
-fig.show()
-
-
-
-cluster_start_end = data.groupby('Cluster')['Time'].agg(['min', 'max'])
-
-
-
-
-data['PreviousCluster'] = data['Cluster'].shift(1)
-
-
-data = data.dropna()
-
-
-transition_counts = (
-    data.groupby(['PreviousCluster', 'Cluster'])
-    .size()
-)
-
-
-print("\nFrequent Transitions Between Clusters:")
-print(transition_counts)
-
-
-
-transition_matrix = (
-    data.groupby(['PreviousCluster', 'Cluster']).size().unstack(fill_value=0)
-)
-print("\nTransition Matrix:")
-print(transition_matrix)
-
-
-labels = [f'Cluster {i}' for i in range(N_CLUSTERS)]
-
-source = []
-target = []
-value = []
-for i in range(N_CLUSTERS):
-    for j in range(N_CLUSTERS):
-        count = transition_matrix.iloc[i, j]
-        if count > 0:
-            source.append(i)
-            target.append(j)
-            value.append(count)
-
+    data['Cluster'] = kmeans.fit_predict(data[[X_COL, Y_COL]].values)
+    return kmeans
+
+
+def read_gaze_chunks(file_path):
+    return pd.read_csv(file_path, sep=r'\s+', header=0, names=COLUMN_NAMES, chunksize=CHUNK_SIZE)
+
+
+def stream_cluster_gaze(file_path, verbose=True):
+    """Clusters a recording in two chunked passes, returns (data, kmeans).
+
+    data holds RecordingTimestamp, the float32 coordinates, the int8 Cluster
+    and Complete, which is False for rows with a missing value in a dropped
+    column. Minibatches span chunk boundaries, so every partial_fit() call
+    gets exactly BATCH_SIZE points except the last one.
+    """
+    kmeans = MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=RANDOM_STATE)
+    pending = np.empty((0, 2))
+    n_points = 0
+    for chunk in read_gaze_chunks(file_path):
+        coordinates = np.concatenate([pending, chunk[[X_COL, Y_COL]].to_numpy(dtype=np.float64)])
+        n_batched = len(coordinates) // BATCH_SIZE * BATCH_SIZE
+        for start in range(0, n_batched, BATCH_SIZE):
+            kmeans.partial_fit(coordinates[start:start + BATCH_SIZE])
+        pending = coordinates[n_batched:]
+        n_points += len(chunk)
+    if len(pending):
+        # The first minibatch initializes the centroids and needs N_CLUSTERS points
+        if not hasattr(kmeans, 'cluster_centers_') and len(pending) < N_CLUSTERS:
+            raise ValueError(f"'{file_path}' has {n_points} gaze points, fewer than N_CLUSTERS ({N_CLUSTERS}).")
+        kmeans.partial_fit(pending)
+    elif not hasattr(kmeans, 'cluster_centers_'):
+        raise ValueError(f"'{file_path}' has no gaze points.")
+
+    chunks = []
+    for chunk in read_gaze_chunks(file_path):
+        coordinates = chunk[[X_COL, Y_COL]].to_numpy(dtype=np.float64)
+        chunks.append(pd.DataFrame({
+            'RecordingTimestamp': chunk['RecordingTimestamp'].to_numpy(),
+            X_COL: coordinates[:, 0].astype(np.float32),
+            Y_COL: coordinates[:, 1].astype(np.float32),
+            'Cluster': kmeans.predict(coordinates).astype(np.int8),
+            'Complete': chunk.notna().all(axis=1).to_numpy(),
+        }))
+    data = pd.concat(chunks, ignore_index=True)
+    if verbose:
+        print(f"Clustered {len(data)} points from '{file_path}' in chunks of {CHUNK_SIZE}.")
+        print("-" * 30)
+    return data, kmeans
+
+
+def transition_cube(data):
+    """Returns (windows, cube) with cube[w, i, j] the i -> j transitions in window w."""
+    windows, window_codes = np.unique(data['TransitionWindow'].values, return_inverse=True)
+    cube = transitions.windowed_pair_counts(
+        window_codes, data['PreviousCluster'].values, data['Cluster'].values,
+        N_CLUSTERS, n_windows=len(windows),
+    )
+    return windows, cube
 
-link = {'source': source, 'target': target, 'value': value}
-node = {'label': labels}
-sankey = go.Sankey(link=link, node=node)
-fig = go.Figure(sankey)
-fig.update_layout(title_text="Cluster Transition", font_size=10)
-fig.show()
 
+def analyze_recording(file_path, verbose=True):
+    """Clusters one recording and computes its usage, dwell and transition arrays."""
+    if STREAM_CLUSTERING:
+        data, kmeans = stream_cluster_gaze(file_path, verbose)
+    else:
+        data = load_gaze(file_path, verbose)
+        kmeans = cluster_gaze(data)
+    points = data[[X_COL, Y_COL, 'Cluster']].copy()
 
+    data['Time'] = pd.to_datetime(
+        data['RecordingTimestamp'], unit='ms'
+    )
+    data['TimeInterval'] = data['Time'].dt.floor(USAGE_INTERVAL)
+    cluster_usage = (
+        data.groupby(['TimeInterval', 'Cluster'])
+        .size()
+        .unstack(fill_value=0)
+        .reindex(columns=range(N_CLUSTERS), fill_value=0)
+    )
 
+    labels = data['Cluster'].values
+    dwell = transitions.dwell_histogram(labels, N_CLUSTERS)
+    lagged_transitions = transitions.lagged_transition_counts(labels, N_CLUSTERS, TRANSITION_LAGS)
+    kgrams = transitions.kgram_counts(transitions.collapse_repeats(labels), N_CLUSTERS, KGRAM_ORDER)
 
+    data['PreviousCluster'] = data['Cluster'].shift(1)
+    if 'Complete' in data:
+        data = data[data.pop('Complete')]
+    data = data.dropna()
 
-window = '10S'
-data['TransitionWindow'] = data['Time'].dt.floor(window)
+    # Dense (from, to) counts; rows are PreviousCluster, columns Cluster
+    transition_matrix = transitions.pair_counts(
+        data['PreviousCluster'].values, data['Cluster'].values, N_CLUSTERS
+    )
 
+    data['TransitionWindow'] = data['Time'].dt.floor(TRANSITION_WINDOW)
+    windows, cube = transition_cube(data)
+
+    return {
+        'points': points,
+        'centers': kmeans.cluster_centers_,
+        'cluster_totals': np.bincount(points['Cluster'], minlength=N_CLUSTERS),
+        'cluster_usage': cluster_usage,
+        'dwell': dwell,
+        'transition_matrix': transition_matrix,
+        'lagged_transitions': lagged_transitions,
+        'kgrams': kgrams,
+        'windows': windows,
+        'transition_cube': cube,
+    }
+
+
+def print_summary(result):
+    print(result['cluster_usage'])
+
+    cluster_totals = pd.Series(result['cluster_totals'], name='count').rename_axis('Cluster')
+    print("\nHeavily Used Regions (Overall):")
+    print(cluster_totals.sort_values(ascending=False))
+
+    dwell = result['dwell']
+    mean_dwell = (dwell * np.arange(1, dwell.shape[1] + 1)).sum(axis=1) / np.maximum(dwell.sum(axis=1), 1)
+    print("\nMean Dwell (points per visit) by Cluster:")
+    print(pd.Series(mean_dwell, name='MeanDwell').rename_axis('Cluster'))
+
+    transition_matrix = result['transition_matrix']
+    transition_counts = pd.Series(
+        transition_matrix.ravel(),
+        index=pd.MultiIndex.from_product(
+            [range(N_CLUSTERS), range(N_CLUSTERS)], names=['PreviousCluster', 'Cluster']
+        ),
+    )
+    print("\nFrequent Transitions Between Clusters:")
+    print(transition_counts[transition_counts > 0])
+
+    print("\nTransition Matrix:")
+    print(pd.DataFrame(
+        transition_matrix,
+        index=pd.Index(range(N_CLUSTERS), name='PreviousCluster'),
+        columns=pd.Index(range(N_CLUSTERS), name='Cluster'),
+    ))
+
+    for lag, counts in zip(TRANSITION_LAGS, result['lagged_transitions']):
+        print(f"\nTransition Matrix at Lag {lag}:")
+        print(pd.DataFrame(
+            counts,
+            index=pd.Index(range(N_CLUSTERS), name='PreviousCluster'),
+            columns=pd.Index(range(N_CLUSTERS), name='Cluster'),
+        ))
+
+    kgrams = result['kgrams']
+    kgram_counts = pd.Series(
+        kgrams.ravel(), index=pd.MultiIndex.from_product([range(N_CLUSTERS)] * kgrams.ndim)
+    )
+    print(f"\nMost Frequent Region Sequences (length {kgrams.ndim}):")
+    print(kgram_counts[kgram_counts > 0].sort_values(ascending=False).head(10))
+
+
+def raster_edges(values):
+    """Returns RASTER_BINS equal-width bin edges over the range of values."""
+    low, high = np.nanmin(values), np.nanmax(values)
+    if not high > low:
+        high = low + 1
+    return np.linspace(low, high, RASTER_BINS + 1)
+
+
+def gaze_raster(x, y, x_edges, y_edges):
+    """Returns the (y, x) point counts per bin, with empty bins as NaN so they stay transparent."""
+    counts, _, _ = np.histogram2d(y, x, bins=[y_edges, x_edges])
+    return np.where(counts > 0, counts, np.nan).astype(np.float32)
+
+
+def gaze_figure(points, title, by_cluster=False):
+    """Plots gaze points as a scatter, a density raster or a random sample (GAZE_RENDERING).
+
+    A raster has one heatmap per cluster when by_cluster is set, so the
+    figure size depends on RASTER_BINS instead of the number of samples.
+    """
+    mode = GAZE_RENDERING
+    if mode not in GAZE_RENDERINGS:
+        raise ValueError(f"Unknown GAZE_RENDERING {mode!r}, expected one of {GAZE_RENDERINGS}.")
+    if mode == 'auto':
+        mode = 'raster' if len(points) > RENDER_MAX_POINTS else 'points'
+    if mode == 'sample' and len(points) > RENDER_MAX_POINTS:
+        points = points.sample(RENDER_MAX_POINTS, random_state=RANDOM_STATE).sort_index()
+    labels = {X_COL: 'X Coordinate', Y_COL: 'Y Coordinate', 'Cluster': 'Cluster'}
+    if mode != 'raster':
+        return px.scatter(
+            points,
+            x=X_COL,
+            y=Y_COL,
+            color='Cluster' if by_cluster else None,
+            title=title,
+            labels=labels,
+        )
+
+    x, y = points[X_COL].values, points[Y_COL].values
+    x_edges, y_edges = raster_edges(x), raster_edges(y)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    fig = go.Figure()
+    if by_cluster:
+        colors = px.colors.qualitative.Plotly
+        clusters = points['Cluster'].values
+        for cluster in range(N_CLUSTERS):
+            r, g, b = px.colors.hex_to_rgb(colors[cluster % len(colors)])
+            in_cluster = clusters == cluster
+            fig.add_trace(go.Heatmap(
+                x=x_centers,
+                y=y_centers,
+                z=gaze_raster(x[in_cluster], y[in_cluster], x_edges, y_edges),
+                colorscale=[[0, f'rgba({r},{g},{b},0.25)'], [1, f'rgba({r},{g},{b},1)']],
+                showscale=False,
+                name=f'Cluster {cluster}',
+                hovertemplate=f'Cluster {cluster}<br>x=%{{x:.0f}}<br>y=%{{y:.0f}}<br>points=%{{z}}<extra></extra>',
+            ))
+    else:
+        fig.add_trace(go.Heatmap(
+            x=x_centers,
+            y=y_centers,
+            z=gaze_raster(x, y, x_edges, y_edges),
+            colorscale='Viridis',
+            colorbar=dict(title='Points'),
+            hovertemplate='x=%{x:.0f}<br>y=%{y:.0f}<br>points=%{z}<extra></extra>',
+        ))
+    fig.update_layout(title=title, xaxis_title=labels[X_COL], yaxis_title=labels[Y_COL])
+    return fig
+
+
+def make_figures(result):
+    """Returns the analysis plots as a list of (name, figure)."""
+    figures = []
+    points = result['points']
+
+    fig = gaze_figure(points, 'Gaze Data')
+    figures.append(('gaze', fig))
+
+    fig = gaze_figure(points, 'K-Means ', by_cluster=True)
+    fig.add_trace(
+        go.Scatter(
+            x=result['centers'][:, 0],
+            y=result['centers'][:, 1],
+            mode='markers',
+            marker=dict(size=12, color='black', symbol='x'),
+            name='Centroids',
+        )
+    )
+    figures.append(('clusters', fig))
 
-cluster_ids = list(range(N_CLUSTERS))
-all_pairs = [(i, j) for i in cluster_ids for j in cluster_ids]
+    cluster_usage_melted = result['cluster_usage'].reset_index().melt(
+        id_vars='TimeInterval',
+        var_name='Cluster',
+        value_name='FixationCount',
+    )
+    fig = px.line(
+        cluster_usage_melted,
+        x='TimeInterval',
+        y='FixationCount',
+        color='Cluster',
+        title='Cluster Usage',
+        labels={'TimeInterval': 'Time', 'FixationCount': 'Number of points'},
+    )
+    figures.append(('usage', fig))
+
+    transition_matrix = result['transition_matrix']
+    source, target = np.nonzero(transition_matrix)
+    link = {'source': source, 'target': target, 'value': transition_matrix[source, target]}
+    node = {'label': [f'Cluster {i}' for i in range(N_CLUSTERS)]}
+    fig = go.Figure(go.Sankey(link=link, node=node))
+    fig.update_layout(title_text="Cluster Transition", font_size=10)
+    figures.append(('transitions', fig))
+
+    # Windows with fewer than two points are left out
+    windows, cube = result['windows'], result['transition_cube']
+    kept = cube.sum(axis=(1, 2)) >= 2
+    n_kept = int(kept.sum())
+    cluster_ids = list(range(N_CLUSTERS))
+    cube_df = pd.DataFrame({
+        'From': np.tile(np.repeat(cluster_ids, N_CLUSTERS), n_kept),
+        'To': np.tile(cluster_ids, N_CLUSTERS * n_kept),
+        'Count': cube[kept].ravel(),
+        'TimeWindow': np.repeat(windows[kept], N_CLUSTERS * N_CLUSTERS),
+    })
+    fig = px.scatter_3d(
+        cube_df,
+        x="From",
+        y="To",
+        z="TimeWindow",
+        color="Count",
+        size="Count",
+        animation_frame="TimeWindow",
+        range_color=[0, cube_df['Count'].max()],
+        title="Space-Time Cube of Cluster Transitions (Animated)",
+        labels={"From": "From Cluster", "To": "To Cluster", "TimeWindow": "Time Window"},
+        color_continuous_scale="Viridis",
+    )
+    fig.update_traces(marker=dict(symbol='circle', opacity=0.8))
+    fig.update_layout(scene=dict(
+        xaxis=dict(dtick=1, title="From Cluster"),
+        yaxis=dict(dtick=1, title="To Cluster"),
+        zaxis=dict(title="Time Window"),
+    ))
+    figures.append(('cube', fig))
+    return figures
+
+
+def save_result(result, file_path):
+    """Writes the result arrays of one recording; times are epoch nanoseconds."""
+    usage = result['cluster_usage']
+    np.savez_compressed(
+        file_path,
+        centers=result['centers'],
+        cluster_totals=result['cluster_totals'],
+        usage_intervals=usage.index.values.astype('datetime64[ns]').astype(np.int64),
+        cluster_usage=usage.to_numpy(),
+        dwell=result['dwell'],
+        transition_matrix=result['transition_matrix'],
+        transition_lags=np.asarray(TRANSITION_LAGS),
+        lagged_transitions=result['lagged_transitions'],
+        kgrams=result['kgrams'],
+        windows=result['windows'].astype('datetime64[ns]').astype(np.int64),
+        transition_cube=result['transition_cube'],
+    )
 
 
-cube_records = []
-for win in sorted(data['TransitionWindow'].unique()):
-    window_data = data[data['TransitionWindow'] == win]
-    if len(window_data) < 2:
-        continue
-    tm = (
-        window_data.groupby(['PreviousCluster', 'Cluster'])
-        .size()
-        .reindex(all_pairs, fill_value=0)
-        .reset_index()
-    )
-    tm.columns = ['From', 'To', 'Count']
-    tm['TimeWindow'] = win
-    cube_records.append(tm)
-
-cube_df = pd.concat(cube_records, ignore_index=True)
-
-fig = px.scatter_3d(
-    cube_df,
-    x="From",
-    y="To",
-    z="TimeWindow",
-    color="Count",
-    size="Count",
-    animation_frame="TimeWindow",
-    range_color=[0, cube_df['Count'].max()],
-    title="Space-Time Cube of Cluster Transitions (Animated)",
-    labels={"From": "From Cluster", "To": "To Cluster", "TimeWindow": "Time Window"},
-    color_continuous_scale="Viridis",
-)
-
-fig.update_traces(marker=dict(symbol='circle', opacity=0.8))
-fig.update_layout(scene=dict(
-    xaxis=dict(dtick=1, title="From Cluster"),
-    yaxis=dict(dtick=1, title="To Cluster"),
-    zaxis=dict(title="Time Window"),
-))
-fig.show()
+def process_recording(file_path, output_dir, write_figures):
+    """Analyzes one recording in a worker and returns its summary row (None on errors)."""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    try:
+        result = analyze_recording(file_path, verbose=False)
+        save_result(result, os.path.join(output_dir, f"{name}.npz"))
+    except Exception as e:
+        print(f"Error processing recording {file_path}: {e}")
+        return None
+    if write_figures:
+        for figure_name, fig in make_figures(result):
+            figure_path = os.path.join(output_dir, f"{name}_{figure_name}.{FIGURE_FORMAT}")
+            try:
+                if FIGURE_FORMAT == 'html':
+                    # Load plotly.js from its CDN instead of embedding ~4 MB per file
+                    fig.write_html(figure_path, include_plotlyjs='cdn')
+                else:
+                    fig.write_image(figure_path)
+            except Exception as e:
+                print(f"Error writing the {figure_name} figure of {file_path}: {e}")
+    row = {'recording': name, 'points': len(result['points'])}
+    for i, count in enumerate(result['cluster_totals']):
+        row[f'cluster_{i}'] = int(count)
+    return row
+
+
+def run_batch(input_dir, output_dir, workers=BATCH_WORKERS, write_figures=WRITE_FIGURES):
+    """Analyzes every recording in input_dir across a process pool.
+
+    Writes one <recording>.npz of result arrays per recording and a
+    summary.csv of points per cluster to output_dir.
+    """
+    files = sorted(glob.glob(os.path.join(input_dir, BATCH_PATTERN)))
+    if not files:
+        print(f"No recordings matching '{BATCH_PATTERN}' in '{input_dir}'.")
+        return
+    if write_figures and FIGURE_FORMAT != 'html' and importlib.util.find_spec('kaleido') is None:
+        print(f"Skipping {FIGURE_FORMAT} figures: writing images needs the kaleido package.")
+        write_figures = False
+    os.makedirs(output_dir, exist_ok=True)
+    workers = min(workers, len(files))
+    print(f"Analyzing {len(files)} recordings with {workers} workers...")
+    process = functools.partial(process_recording, output_dir=output_dir, write_figures=write_figures)
+    if workers <= 1:
+        rows = [process(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(process, files))
+    summary = pd.DataFrame([row for row in rows if row is not None])
+    summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+    print(f"Wrote results of {len(summary)} recordings to '{output_dir}'.")
+
+
+if __name__ == '__main__':
+    if BATCH_INPUT_DIR is not None:
+        run_batch(BATCH_INPUT_DIR, BATCH_OUTPUT_DIR)
+    else:
+        result = analyze_recording(FILE_PATH)
+        print_summary(result)
+        for _, fig in make_figures(result):
+            fig.show()
@@ -0,0 +1,121 @@
+"""Dense transition counts over integer state sequences (e.g. gaze clusters).
+
+Every count is one np.bincount over a combined integer key, so the cost is
+linear in the sequence length and independent of how many states there are,
+and the results are plain NumPy arrays indexed by state:
+
+- pair_counts() / transition_counts(): (n_states, n_states) from -> to counts,
+  at lag 1 or any lag n.
+- windowed_pair_counts(): a (window, from, to) stack of pair counts.
+- lagged_transition_counts(): a (lag, from, to) stack for several lags.
+- kgram_counts(): k-order counts with shape (n_states,) * order.
+- dwell_histogram(): (n_states, max_length) counts of run lengths.
+
+States must be integers in [0, n_states). Scanpaths sampled at a fixed rate
+repeat the same state for many samples; pass collapse_repeats(labels) to
+count transitions between distinct regions only.
+"""
+import numpy as np
+
+# Largest dense k-gram array (in cells) kgram_counts() will allocate
+MAX_DENSE_CELLS = 100_000_000
+
+
+def _states(labels, n_states):
+    labels = np.asarray(labels).astype(np.int64)
+    if len(labels) and (labels.min() < 0 or labels.max() >= n_states):
+        raise ValueError(f"States must be in [0, {n_states}), got [{labels.min()}, {labels.max()}].")
+    return labels
+
+
+def pair_counts(from_states, to_states, n_states):
+    """Returns the (n_states, n_states) count matrix of (from, to) pairs."""
+    keys = _states(from_states, n_states) * n_states + _states(to_states, n_states)
+    return np.bincount(keys, minlength=n_states * n_states).reshape(n_states, n_states)
+
+
+def windowed_pair_counts(window_codes, from_states, to_states, n_states, n_windows=None):
+    """Returns the (n_windows, n_states, n_states) counts of (window, from, to) triples.
+
+    window_codes are integers in [0, n_windows); n_windows defaults to the
+    largest code + 1.
+    """
+    window_codes = np.asarray(window_codes).astype(np.int64)
+    if len(window_codes) and window_codes.min() < 0:
+        raise ValueError("Window codes must not be negative.")
+    if n_windows is None:
+        n_windows = int(window_codes.max()) + 1 if len(window_codes) else 0
+    elif len(window_codes) and window_codes.max() >= n_windows:
+        raise ValueError(f"Window codes must be below n_windows ({n_windows}).")
+    keys = (window_codes * n_states + _states(from_states, n_states)) * n_states + _states(to_states, n_states)
+    return np.bincount(keys, minlength=n_windows * n_states * n_states).reshape(n_windows, n_states, n_states)
+
+
+def transition_counts(labels, n_states, lag=1):
+    """Returns counts of labels[t - lag] -> labels[t] as an (n_states, n_states) matrix."""
+    labels = _states(labels, n_states)
+    if lag < 1:
+        raise ValueError(f"lag must be at least 1, got {lag}.")
+    return pair_counts(labels[:-lag], labels[lag:], n_states)
+
+
+def lagged_transition_counts(labels, n_states, lags):
+    """Returns a (len(lags), n_states, n_states) stack of transition_counts() per lag."""
+    labels = _states(labels, n_states)
+    counts = np.zeros((len(lags), n_states, n_states), dtype=np.int64)
+    for i, lag in enumerate(lags):
+        counts[i] = transition_counts(labels, n_states, lag)
+    return counts
+
+
+def kgram_counts(labels, n_states, order):
+    """Returns counts of every run of order consecutive states, shape (n_states,) * order.
+
+    counts[a, b, c] is how often a -> b -> c occurs for order 3; order 2 is
+    transition_counts() at lag 1.
+    """
+    labels = _states(labels, n_states)
+    if order < 1:
+        raise ValueError(f"order must be at least 1, got {order}.")
+    if n_states ** order > MAX_DENSE_CELLS:
+        raise ValueError(
+            f"{n_states} states at order {order} need {n_states ** order} cells "
+            f"(MAX_DENSE_CELLS is {MAX_DENSE_CELLS})."
+        )
+    n_grams = max(len(labels) - order + 1, 0)
+    keys = np.zeros(n_grams, dtype=np.int64)
+    for i in range(order):
+        keys = keys * n_states + labels[i:i + n_grams]
+    return np.bincount(keys, minlength=n_states ** order).reshape((n_states,) * order)
+
+
+def runs(labels):
+    """Returns (states, starts, lengths) of the runs of repeated states in labels."""
+    labels = np.asarray(labels)
+    if not len(labels):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    starts = np.concatenate([[0], np.flatnonzero(labels[1:] != labels[:-1]) + 1])
+    lengths = np.diff(np.append(starts, len(labels)))
+    return labels[starts], starts, lengths
+
+
+def collapse_repeats(labels):
+    """Returns labels with consecutive repeats removed (one entry per run)."""
+    return runs(labels)[0]
+
+
+def dwell_histogram(labels, n_states, max_length=None):
+    """Returns (n_states, max_length) counts of runs by state and length in samples.
+
+    Column L - 1 counts the runs of length L; runs longer than max_length are
+    counted in the last column. By default max_length is the longest run.
+    """
+    states, _, lengths = runs(_states(labels, n_states))
+    if max_length is None:
+        max_length = int(lengths.max()) if len(lengths) else 1
+    if max_length < 1:
+        raise ValueError(f"max_length must be at least 1, got {max_length}.")
+    lengths = np.minimum(lengths, max_length)
+    keys = states * max_length + lengths - 1
+    return np.bincount(keys, minlength=n_states * max_length).reshape(n_states, max_length)